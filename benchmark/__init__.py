@@ -0,0 +1,12 @@
+from .synthetic import generate_corpus, load_gabarito, TIPOS
+from .harness import run_benchmark, score_results, print_accuracy, save_report
+
+__all__ = [
+    "generate_corpus",
+    "load_gabarito",
+    "TIPOS",
+    "run_benchmark",
+    "score_results",
+    "print_accuracy",
+    "save_report",
+]
@@ -0,0 +1,37 @@
+import os
+import argparse
+import multiprocessing
+from config import BENCH_CORPUS_DIR, BENCH_DOCS_PER_TIPO, BENCH_SEED
+from . import generate_corpus, run_benchmark, print_accuracy, save_report
+from .synthetic import GABARITO
+
+# python -m benchmark                      -> gera o corpus (se faltar) e roda
+# python -m benchmark --gerar              -> regenera o corpus antes
+# python -m benchmark --workers 4 --threads 1 --relatorio bench.json
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark com documentos sintéticos")
+    parser.add_argument("--corpus", default=BENCH_CORPUS_DIR)
+    parser.add_argument("--gerar", action="store_true", help="regenera o corpus sintético")
+    parser.add_argument("--por-tipo", type=int, default=BENCH_DOCS_PER_TIPO)
+    parser.add_argument("--semente", type=int, default=BENCH_SEED)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--com-cache", action="store_true", help="usa o cache de OCR (medição a quente)")
+    parser.add_argument("--relatorio", default=None, help="grava o relatório completo em JSON")
+    args = parser.parse_args()
+
+    if args.gerar or not os.path.exists(os.path.join(args.corpus, GABARITO)):
+        generate_corpus(args.corpus, n_per_tipo=args.por_tipo, seed=args.semente)
+
+    relatorio = run_benchmark(args.corpus, workers=args.workers, threads=args.threads,
+                              usar_cache=args.com_cache)
+    print_accuracy(relatorio)
+    if args.relatorio:
+        save_report(relatorio, args.relatorio)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,104 @@
+import os
+import json
+import multiprocessing
+from functools import partial
+from collections import defaultdict
+from utils import normalize_text
+from process import process_pdf
+from extract_name_pipeline import prepare_name_pipeline
+from nlp_loader import init_worker
+from concurrency import plan_workers
+from instrumentation import RunSummary
+from ocr.ocr_cache import set_ocr_cache_enabled
+from .synthetic import load_gabarito
+
+# ---------------- BENCHMARK DE VELOCIDADE + ACURÁCIA ----------------
+# Roda o process_pdf (sem renomear) sobre o corpus sintético e compara com o
+# gabarito: docs/s, latência por etapa (instrumentation.RunSummary) e
+# acurácia de tipo, data, nome e motivo (motivo só conta em advertências).
+
+CAMPOS = ("tipo", "data", "nome", "motivo")
+
+
+def _init_bench_worker(threads, usar_cache):
+    init_worker(None, None, threads)
+    # por padrão o OCR é medido a frio: o cache de OCR esconderia o custo real
+    set_ocr_cache_enabled(usar_cache)
+
+
+def _igual(campo, esperado, obtido):
+    if campo == "nome":
+        return normalize_text(str(esperado or "")).strip() == normalize_text(str(obtido or "")).strip()
+    return esperado == obtido
+
+
+def score_results(gabaritos, results):
+    """Acurácia por campo (geral e por tipo) + lista de erros."""
+    acertos = defaultdict(int)
+    total = defaultdict(int)
+    por_tipo = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    erros = []
+
+    for gab, res in zip(gabaritos, results):
+        res = res or {}
+        for campo in CAMPOS:
+            if campo == "motivo" and gab["tipo"] != "advertencia":
+                continue
+            ok = res.get("status") == "ok" and _igual(campo, gab[campo], res.get(campo))
+            total[campo] += 1
+            acertos[campo] += ok
+            por_tipo[gab["tipo"]][campo][0] += ok
+            por_tipo[gab["tipo"]][campo][1] += 1
+            if not ok:
+                erros.append({"arquivo": gab["arquivo"], "campo": campo,
+                              "esperado": gab[campo], "obtido": res.get(campo)})
+
+    return {
+        "acuracia": {c: round(acertos[c] / total[c], 3) for c in CAMPOS if total[c]},
+        "por_tipo": {t: {c: round(a / n, 3) for c, (a, n) in campos.items()}
+                     for t, campos in por_tipo.items()},
+        "erros": erros,
+    }
+
+
+def run_benchmark(corpus_dir, workers=None, threads=None, usar_cache=False):
+    """Processa o corpus e devolve o relatório (velocidade + acurácia)."""
+    gabaritos = load_gabarito(corpus_dir)
+    files = [os.path.join(corpus_dir, g["arquivo"]) for g in gabaritos]
+    workers, threads = plan_workers(workers, threads)
+    print(f"🏁 Benchmark: {len(files)} documentos | workers: {workers} x {threads} thread(s) | "
+          f"cache de OCR {'ligado' if usar_cache else 'desligado'}")
+
+    summary = RunSummary(path=None)
+    prepare_name_pipeline()
+    with multiprocessing.Pool(processes=workers, initializer=_init_bench_worker,
+                              initargs=(threads, usar_cache)) as pool:
+        # caminho absoluto: os.path.join(INPUT_FOLDER, abs) ignora INPUT_FOLDER
+        results = pool.map(partial(process_pdf, rename=False), files)
+    for res in results:
+        summary.add((res or {}).get("metricas"))
+
+    relatorio = {"velocidade": summary.report(), **score_results(gabaritos, results)}
+    summary.print_report()
+    return relatorio
+
+
+def print_accuracy(relatorio, max_erros=10):
+    print("\n🎯 Acurácia por campo:")
+    for campo, acc in relatorio["acuracia"].items():
+        print(f"   {campo:<8} {acc * 100:6.1f}%")
+    print("\n🎯 Por tipo:")
+    for tipo, campos in sorted(relatorio["por_tipo"].items()):
+        resumo = "  ".join(f"{c}={a * 100:.0f}%" for c, a in campos.items())
+        print(f"   {tipo:<12} {resumo}")
+    erros = relatorio["erros"]
+    if erros:
+        print(f"\n❌ {len(erros)} erro(s); primeiros {min(max_erros, len(erros))}:")
+        for e in erros[:max_erros]:
+            print(f"   {e['arquivo']} [{e['campo']}] esperado={e['esperado']!r} obtido={e['obtido']!r}")
+
+
+def save_report(relatorio, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"💾 Relatório gravado em {path}")
@@ -0,0 +1,271 @@
+"""
+Corpus sintético com gabarito para o benchmark, sem nenhum scan real.
+
+Os PDFs saem "escaneados" (só imagem, sem camada de texto), nos quatro tipos
+que o pipeline classifica:
+
+  ponto       -> folha de controle de jornada, 2–3 páginas, paisagem
+  advertencia -> advertência disciplinar com motivo
+  carta       -> carta ao motorista
+  atestado    -> atestado médico
+
+Cada página recebe degradações de scanner: inclinação de alguns graus,
+ruído gaussiano, sal-e-pimenta, desfoque e, às vezes, rotação de 180°.
+Tudo sai de um gerador com semente: mesma semente = mesmo corpus.
+
+Gabarito (gabarito.jsonl, uma linha por PDF):
+  {"arquivo", "tipo", "nome", "data" (dd-mm-aaaa já normalizada como o
+   pipeline devolve), "motivo" (só advertência), "degradacoes"}
+"""
+
+import os
+import json
+import random
+from datetime import date, datetime, timedelta
+import numpy as np
+import cv2
+from PIL import Image, ImageDraw, ImageFont
+from motoristas import motoristas
+from date_extractor import normalize_date_for_tipo
+
+TIPOS = ("ponto", "advertencia", "carta", "atestado")
+
+GABARITO = "gabarito.jsonl"
+
+DPI = 200
+A4 = (int(8.27 * DPI), int(11.69 * DPI))
+
+_FONTES = ("DejaVuSans.ttf", "LiberationSans-Regular.ttf", "arial.ttf", "Arial.ttf")
+
+_MESES = ("janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho",
+          "agosto", "setembro", "outubro", "novembro", "dezembro")
+
+# motivo (rótulo humano) -> frase no corpo da advertência
+_MOTIVOS = {
+    "CELULAR": "uso de aparelho celular durante a condução do veículo",
+    "CINTO": "não utilização do cinto de segurança durante o trajeto",
+    "VELOCIDADE": "excesso de velocidade registrado pela telemetria",
+    "DROGAS": "ter sido flagrado fumando dentro da cabine",
+    "INTRAJORNADA": "não cumprimento do intervalo intrajornada mínimo",
+}
+
+_CIDADES = ("São Paulo", "Curitiba", "Campinas", "Londrina", "Joinville")
+
+
+def _font(size):
+    for nome in _FONTES:
+        try:
+            return ImageFont.truetype(nome, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:   # Pillow < 10.1
+        return ImageFont.load_default()
+
+
+def _por_extenso(d):
+    return f"{d.day} de {_MESES[d.month - 1]} de {d.year}"
+
+
+def _data_aleatoria(rng):
+    # sempre no passado (normalize_date_for_tipo corrige datas futuras)
+    inicio = date(2024, 1, 1)
+    return inicio + timedelta(days=rng.randrange(0, 540))
+
+
+def _motorista(rng):
+    m = rng.choice(motoristas)
+    return (m[0], m[1]) if isinstance(m, (list, tuple)) and len(m) > 1 else ("", str(m))
+
+
+# ---------------- TEXTOS POR TIPO ----------------
+def _texto_advertencia(rng, codigo, nome, d):
+    motivo = rng.choice(sorted(_MOTIVOS))
+    linhas = [
+        "ADVERTÊNCIA DISCIPLINAR",
+        "",
+        f"Colaborador: {nome}    Matrícula: {codigo}",
+        "",
+        "Pela presente, fica o colaborador acima advertido em razão de",
+        f"{_MOTIVOS[motivo]}, conduta contrária às normas da empresa.",
+        "Em caso de reincidência, medidas mais severas poderão ser aplicadas.",
+        "",
+        f"{rng.choice(_CIDADES)}, {_por_extenso(d)}.",
+        "",
+        "_____________________________          _____________________________",
+        "Empresa                                              Colaborador",
+    ]
+    return [linhas], motivo
+
+
+def _texto_carta(rng, codigo, nome, d):
+    linhas = [
+        f"{rng.choice(_CIDADES)}, {d.strftime('%d/%m/%Y')}",
+        "",
+        f"Prezado Sr. {nome},",
+        "",
+        "Venho por meio desta informar que sua solicitação de transferência",
+        "de base foi recebida e será analisada pelo setor de recursos humanos.",
+        "Pedimos que aguarde o contato da coordenação nos próximos dias.",
+        "",
+        "Atenciosamente,",
+        "Departamento Pessoal",
+    ]
+    return [linhas], None
+
+
+def _texto_atestado(rng, codigo, nome, d):
+    dias = rng.randint(1, 5)
+    linhas = [
+        "ATESTADO MÉDICO",
+        "",
+        f"Atesto, para os devidos fins, que o Sr. {nome} compareceu a esta",
+        f"clínica em {d.strftime('%d/%m/%Y')} e necessita de {dias} dia(s) de afastamento",
+        "de suas atividades a partir desta data.",
+        "",
+        f"CID: {rng.choice(['J11', 'M54.5', 'A09', 'R51'])}",
+        "",
+        "Dr. Carlos Menezes - CRM 12345",
+        "Consultório Vida e Saúde",
+    ]
+    return [linhas], None
+
+
+def _texto_ponto(rng, codigo, nome, d):
+    # período do mês inteiro; a data "final" do documento é o último dia registrado
+    inicio = d.replace(day=1)
+    dias = []
+    dia = inicio
+    while dia.month == inicio.month:
+        if dia.weekday() < 6:
+            dias.append(dia)
+        dia += timedelta(days=1)
+
+    cabecalho = [
+        "CONTROLE DE JORNADA - REGISTRO DE PONTO",
+        f"Motorista: {codigo} - {nome}",
+        f"Período: {dias[0].strftime('%d/%m/%Y')} a {dias[-1].strftime('%d/%m/%Y')}",
+        "",
+        "Data          Entrada   Almoço    Retorno   Saída     Horas",
+    ]
+    linhas = []
+    for dia in dias:
+        e = rng.choice(["06:00", "06:30", "07:00", "07:15"])
+        s = rng.choice(["16:00", "17:00", "17:30", "18:10"])
+        linhas.append(f"{dia.strftime('%d/%m/%Y')}    {e}     11:00     12:00     {s}     08:00")
+
+    por_pagina = (len(linhas) + 1) // 2 if rng.random() < 0.5 else (len(linhas) + 2) // 3
+    paginas = []
+    for i in range(0, len(linhas), por_pagina):
+        paginas.append(cabecalho + linhas[i:i + por_pagina])
+    paginas[-1] += ["", "Assinatura do motorista: ____________________"]
+    return paginas, None, dias[-1]
+
+
+# ---------------- RENDERIZAÇÃO + DEGRADAÇÃO ----------------
+def _render_page(linhas, paisagem=False):
+    size = (A4[1], A4[0]) if paisagem else A4
+    img = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(img)
+    font = _font(int(DPI * 0.16))
+    y = int(DPI * 0.8)
+    for linha in linhas:
+        draw.text((int(DPI * 0.8), y), linha, fill=0, font=font)
+        y += int(DPI * 0.26)
+    return np.array(img)
+
+
+def _degrade(img, rng, nrng):
+    """Aplica as degradações de scanner e devolve (imagem, descrição)."""
+    info = {}
+    h, w = img.shape
+
+    angulo = rng.uniform(-3.0, 3.0)
+    M = cv2.getRotationMatrix2D((w / 2, h / 2), angulo, 1.0)
+    img = cv2.warpAffine(img, M, (w, h), flags=cv2.INTER_LINEAR, borderValue=255)
+    info["inclinacao"] = round(angulo, 2)
+
+    if rng.random() < 0.15:
+        img = cv2.rotate(img, cv2.ROTATE_180)
+        info["rotacao"] = 180
+
+    sigma = rng.uniform(4, 18)
+    img = np.clip(img.astype(np.float32) + nrng.normal(0, sigma, img.shape), 0, 255)
+    info["ruido"] = round(sigma, 1)
+
+    sal = rng.uniform(0, 0.004)
+    mask = nrng.random(img.shape)
+    img[mask < sal / 2] = 0
+    img[mask > 1 - sal / 2] = 255
+    info["sal_pimenta"] = round(sal, 4)
+
+    if rng.random() < 0.4:
+        img = cv2.GaussianBlur(img, (3, 3), 0)
+        info["desfoque"] = True
+
+    return img.astype(np.uint8), info
+
+
+def generate_document(tipo, rng, nrng):
+    """Gera as páginas degradadas de um documento. Retorna (páginas, gabarito)."""
+    codigo, nome = _motorista(rng)
+    d = _data_aleatoria(rng)
+    motivo = None
+    paisagem = False
+
+    if tipo == "ponto":
+        paginas, motivo, d = _texto_ponto(rng, codigo, nome, d)
+        paisagem = True
+    elif tipo == "advertencia":
+        paginas, motivo = _texto_advertencia(rng, codigo, nome, d)
+    elif tipo == "carta":
+        paginas, motivo = _texto_carta(rng, codigo, nome, d)
+    else:
+        paginas, motivo = _texto_atestado(rng, codigo, nome, d)
+
+    imgs, degradacoes = [], []
+    for linhas in paginas:
+        img, info = _degrade(_render_page(linhas, paisagem), rng, nrng)
+        imgs.append(img)
+        degradacoes.append(info)
+
+    data = normalize_date_for_tipo(datetime(d.year, d.month, d.day), tipo).strftime("%d-%m-%Y")
+    gabarito = {"tipo": tipo, "nome": nome, "data": data, "motivo": motivo,
+                "paginas": len(imgs), "degradacoes": degradacoes}
+    return imgs, gabarito
+
+
+def _save_pdf(imgs, path):
+    pil = [Image.fromarray(i) for i in imgs]
+    pil[0].save(path, "PDF", resolution=DPI, save_all=True, append_images=pil[1:])
+
+
+def generate_corpus(out_dir, n_per_tipo=10, seed=1234):
+    """
+    Grava n_per_tipo PDFs de cada tipo em `out_dir` e o gabarito.jsonl.
+    Retorna a lista de gabaritos (com "arquivo").
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    nrng = np.random.default_rng(seed)
+
+    gabaritos = []
+    for tipo in TIPOS:
+        for i in range(n_per_tipo):
+            imgs, gab = generate_document(tipo, rng, nrng)
+            arquivo = f"sintetico_{tipo}_{i:03d}.pdf"
+            _save_pdf(imgs, os.path.join(out_dir, arquivo))
+            gab["arquivo"] = arquivo
+            gabaritos.append(gab)
+
+    with open(os.path.join(out_dir, GABARITO), "w", encoding="utf-8") as f:
+        for gab in gabaritos:
+            f.write(json.dumps(gab, ensure_ascii=False) + "\n")
+    print(f"🧪 {len(gabaritos)} documentos sintéticos gerados em {out_dir} (semente {seed})")
+    return gabaritos
+
+
+def load_gabarito(corpus_dir):
+    with open(os.path.join(corpus_dir, GABARITO), "r", encoding="utf-8") as f:
+        return [json.loads(l) for l in f if l.strip()]
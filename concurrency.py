@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import itertools
+import multiprocessing
+from config import WORKERS, THREADS_PER_WORKER
+
+# ---------------- ORÇAMENTO DE THREADS ----------------
+# Cada worker do Pool recebe um número fixo de threads e TODAS as bibliotecas
+# que criam threads próprias respeitam esse número:
+#   OCRmyPDF (jobs), Tesseract/OpenMP (OMP_THREAD_LIMIT), torch (set_num_threads),
+#   OpenCV (setNumThreads) e BLAS (OMP/MKL/OPENBLAS_NUM_THREADS).
+# Sem isso, N workers x threads de cada lib estouram o número de núcleos.
+
+_THREADS = None
+
+_ENV_VARS = ("OMP_THREAD_LIMIT", "OMP_NUM_THREADS", "MKL_NUM_THREADS",
+             "OPENBLAS_NUM_THREADS")
+
+
+def plan_workers(workers=None, threads=None):
+    """(workers, threads_por_worker) a partir da config; padrão = 1 thread por núcleo."""
+    cores = multiprocessing.cpu_count()
+    workers = workers or WORKERS or cores
+    threads = threads or THREADS_PER_WORKER or max(1, cores // workers)
+    return workers, threads
+
+
+def apply_thread_budget(threads):
+    """Aplica o orçamento no processo atual (chamado no initializer de cada worker)."""
+    global _THREADS
+    _THREADS = max(1, int(threads))
+    for var in _ENV_VARS:
+        os.environ[var] = str(_THREADS)   # herdado pelos subprocessos do Tesseract
+    try:
+        import cv2
+        cv2.setNumThreads(_THREADS)
+    except Exception:
+        pass
+    # torch só é ajustado se já foi importado; senão, ao carregar o modelo (nlp_loader)
+    if "torch" in sys.modules:
+        apply_torch_threads()
+
+
+def apply_torch_threads():
+    if _THREADS is None:
+        return
+    try:
+        import torch
+        torch.set_num_threads(_THREADS)
+    except Exception:
+        pass
+
+
+def worker_threads():
+    """Threads disponíveis para o worker atual (1 se nenhum orçamento foi aplicado)."""
+    return _THREADS or 1
+
+
+# ---------------- BENCHMARK ----------------
+def _copy_sample(files, dest):
+    copies = []
+    for f in files:
+        target = os.path.join(dest, os.path.basename(f))
+        shutil.copy2(f, target)
+        copies.append(target)
+    return copies
+
+
+def _init_bench_worker(threads):
+    from nlp_loader import init_worker
+    from ocr.ocr_cache import set_ocr_cache_enabled
+    init_worker(None, None, threads)
+    # OCR medido a frio: com o cache, da 2ª combinação em diante só haveria acertos
+    set_ocr_cache_enabled(False)
+
+
+def run_thread_benchmark(files, workers_options, threads_options):
+    """
+    Roda a amostra `files` (caminhos absolutos) em cada combinação
+    workers x threads e retorna [(workers, threads, docs/s, segundos)].
+    Os PDFs são copiados para uma pasta temporária (process_pdf renomeia) e
+    o cache de OCR fica desligado nos workers.
+    """
+    from process import process_pdf
+    from extract_name_pipeline import prepare_name_pipeline
+
+    prepare_name_pipeline()
+    results = []
+    for workers, threads in itertools.product(workers_options, threads_options):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            copies = _copy_sample(files, tmpdir)
+            t0 = time.perf_counter()
+            with multiprocessing.Pool(processes=workers, initializer=_init_bench_worker,
+                                      initargs=(threads,)) as pool:
+                # caminho absoluto: os.path.join(INPUT_FOLDER, abs) ignora INPUT_FOLDER
+                pool.map(process_pdf, copies)
+            elapsed = time.perf_counter() - t0
+        rate = len(files) / elapsed if elapsed else 0.0
+        results.append((workers, threads, rate, elapsed))
+        print(f"⏱️ workers={workers:>3} threads={threads:>2} -> {rate:.2f} docs/s ({elapsed:.1f}s)",
+              flush=True)
+    return results
+
+
+def print_benchmark(results):
+    print("\nworkers  threads  docs/s   tempo(s)")
+    for workers, threads, rate, elapsed in sorted(results, key=lambda r: -r[2]):
+        print(f"{workers:>7}  {threads:>7}  {rate:>6.2f}  {elapsed:>9.1f}")
+    best = max(results, key=lambda r: r[2])
+    print(f"\n🏆 Melhor: WORKERS={best[0]}, THREADS_PER_WORKER={best[1]}")
@@ -1,11 +1,12 @@
 import os
 import pytesseract
 from multiprocessing import Pool, cpu_count
-from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
 
 # Atualizar modelos e caminhos, utilizei os caminhos do poppler e do ghostscript por nao ter acesso ao path do sistema.
 EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
-EMBED_CACHE_FILENAME = "motoristas_embeddings.pkl"
+# Cache de embeddings do roster: <pasta>/<prefixo>-<modelo>-<hash>.npy (+ .json)
+EMBED_CACHE_FILENAME = "motoristas_embeddings"
+EMBED_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
 EMBED_SIM_THRESHOLD = 0.93
 FUZZY_THRESHOLD = 98
 PHRASE_MATCH_EXACT = True
@@ -15,6 +16,80 @@ INPUT_FOLDER = r""
 POPPLER_PATH = r""
 MAX_PROCESSES = max(1, cpu_count() - 1)
 
+# Orçamento de threads (concurrency.py): WORKERS processos no Pool, cada um com
+# THREADS_PER_WORKER threads para OCRmyPDF/Tesseract(OpenMP)/torch/OpenCV.
+# None = núcleos detectados / núcleos // workers.
+WORKERS = None
+THREADS_PER_WORKER = None
+NER_SERVICE_THREADS = None    # threads do processo de NER (None = THREADS_PER_WORKER)
+
+# python main.py --bench: amostra da INPUT_FOLDER e combinações testadas
+BENCH_SAMPLE = 20
+BENCH_WORKERS = None          # ex.: [32, 16, 8]; None = [núcleos, núcleos/2, núcleos/4]
+BENCH_THREADS = [1, 2, 4]
+
+# python -m benchmark: corpus sintético (benchmark/synthetic.py) com gabarito
+BENCH_CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_corpus")
+BENCH_DOCS_PER_TIPO = 10
+BENCH_SEED = 1234
+
+# Agendador (main.py): no máximo MAX_IN_FLIGHT PDFs enviados ao Pool ao mesmo tempo
+# (None = 2 x núcleos); workers reciclados a cada MAX_TASKS_PER_CHILD documentos.
+MAX_IN_FLIGHT = None
+MAX_TASKS_PER_CHILD = 50
+WATCH_INTERVAL = 5            # segundos entre varreduras no modo --watch
+PAGE_CACHE_MAX_MB = 512       # orçamento de rasters em memória por documento
+# Rasterização (ocr/page_source.py): "fitz" = PyMuPDF direto para numpy (sem
+# subprocesso/PPM); "pdf2image" = poppler. DPI pedido por cada estágio:
+PAGE_RENDERER = "fitz"
+RENDER_DPI_GEOMETRY = 150     # cinza para OSD + inclinação (ocr/page_geometry.py)
+RENDER_DPI_DETECT = 150       # cinza para o detector de tabela/bloco do nome
+RENDER_DPI_OCR = 300          # páginas e regiões que vão para o Tesseract
+
+# OCR com DPI adaptativo (ocr/adaptive_ocr.py): página escaneada lida primeiro em
+# OCR_DPI_LOW; linhas com confiança < OCR_MIN_LINE_CONF relidas em OCR_DPI_STEPS[0];
+# página fraca (confiança média < OCR_MIN_PAGE_CONF, menos de OCR_MIN_WORDS palavras ou
+# mais de OCR_WEAK_LINES_MAX das linhas fracas) refeita em cada DPI de OCR_DPI_STEPS.
+# A página 1 também sobe de DPI quando tipo/nome/data saem com confiança baixa.
+OCR_ADAPTIVE_DPI = True
+OCR_DPI_LOW = 200
+OCR_DPI_STEPS = (300, 400)
+OCR_MIN_PAGE_CONF = 75
+OCR_MIN_LINE_CONF = 60
+OCR_WEAK_LINES_MAX = 0.3
+OCR_MIN_WORDS = 5
+# Documentos com pelo menos esse número de páginas são OCRizados página a página
+# em paralelo pelo Pool (0 = desliga a divisão)
+PAGE_SPLIT_MIN_PAGES = 8
+
+# Pré-processamento (ocr/preprocess.py): deskew estimado numa cópia com lado maior
+# <= DESKEW_MAX_SIDE px, buscando até ±DESKEW_MAX_ANGLE graus; denoise só quando o
+# ruído estimado (sigma) passa de NOISE_SKIP_SIGMA (NLMeans acima de NOISE_HEAVY_SIGMA)
+DESKEW_MAX_SIDE = 1000
+DESKEW_MAX_ANGLE = 10
+NOISE_SKIP_SIGMA = 3.0
+NOISE_HEAVY_SIGMA = 8.0
+
+# Geometria da página (ocr/page_geometry.py): rotação 0/90/180/270 + inclinação,
+# calculadas uma vez por página numa cópia com lado maior <= PAGE_GEOMETRY_MAX_SIDE.
+# PAGE_GEOMETRY_OSD=False troca o OSD do Tesseract pelo perfil de projeção (só 0/90).
+PAGE_GEOMETRY_OSD = True
+PAGE_GEOMETRY_MAX_SIDE = 1600
+
+# Cache de resultados de OCR (ocr/ocr_cache.py): chave = hash do PDF/imagem + lang/DPI/psm.
+# Reprocessar o acervo depois de mudar regras de extração não roda o Tesseract de novo.
+OCR_CACHE_ENABLED = True
+OCR_CACHE_DIR = os.path.join(EMBED_CACHE_DIR, "ocr")
+OCR_CACHE_MAX_MB = 2048       # acima disso, os resultados usados há mais tempo são apagados
+
+# Instrumentação (instrumentation.py): uma linha JSON por documento com tempo de
+# parede/CPU por etapa, contadores e pico de RSS (None = só o resumo no console)
+METRICS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "metricas.jsonl")
+
+# Diário de processamento (journal.py): SQLite por hash do conteúdo do PDF
+JOURNAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "processamento.sqlite3")
+JOURNAL_MAX_RETRIES = 3       # tentativas antes de desistir de um documento com erro
+
 # Tesseract OCR
 TESSERACT_EXE_PATH = r""
 pytesseract.pytesseract.tesseract_cmd = TESSERACT_EXE_PATH
@@ -30,12 +105,32 @@ output_folder = r""
 # Modelo atual, se preferir pode mudar para grandes modelos pagos
 NER_MODEL_PATH = r"marcosgg/bert-base-pt-ner-enamex"
 
-tokenizer = AutoTokenizer.from_pretrained(NER_MODEL_PATH)
-model = AutoModelForTokenClassification.from_pretrained(NER_MODEL_PATH)
+# Modelos são carregados sob demanda, uma vez por worker (ver nlp_loader.py).
+# Nomes aceitos: "hf_ner", "ner_pipeline", "name_pipeline", "ocr_engine". Vazio = tudo preguiçoso.
+PRELOAD_MODELS = []
+
+# NER HuggingFace como etapa da extração de nome:
+#   None      -> desligado (padrão)
+#   "local"   -> modelo carregado em cada worker
+#   "service" -> um único processo dono do modelo, com batching (ner_service.py)
+HF_NER_MODE = None
+NER_MAX_BATCH_TOKENS = 8192   # tokens (com padding) por batch no serviço
+NER_MAX_WAIT_MS = 20          # janela para juntar pedidos de vários workers
+NER_MAX_LENGTH = 512          # truncamento: textos maiores viram vários pedaços
+
+# OCR progressivo: OCRiza a página 1, roda os extratores e só segue para as
+# demais páginas se o tipo estiver em PROGRESSIVE_FULL_TIPOS ou se alguma
+# confiança (tipo/nome/data) ficar abaixo de PROGRESSIVE_MIN_CONFIDENCE.
+PROGRESSIVE_OCR = True
+PROGRESSIVE_MIN_CONFIDENCE = 0.5
+PROGRESSIVE_FULL_TIPOS = {"ponto", "desconhecido"}
+
+# Motor de OCR (ocr/engine.py): "auto" usa tesserocr (Tesseract dentro do processo,
+# um por worker) se estiver instalado; senão pytesseract (subprocesso por chamada).
+OCR_ENGINE = "auto"
+TESSDATA_PATH = None          # pasta tessdata para o tesserocr (None = padrão da instalação)
 
-nlp_name = pipeline(
-    "ner",
-    model=model,
-    tokenizer=tokenizer,
-    aggregation_strategy="simple"  # agrupa tokens em entidades completas
-)
\ No newline at end of file
+# Backend de OCR das páginas escaneadas:
+#   "tesseract" -> Tesseract TSV direto sobre o raster em cache (texto + palavras com caixa/confiança)
+#   "ocrmypdf"  -> OCRmyPDF lendo o sidecar de texto
+OCR_BACKEND = "tesseract"
\ No newline at end of file
@@ -1,9 +1,17 @@
-from .extract_final_date import extract_final_date
+from .extract_final_date import extract_final_date, extract_final_date_scored, extract_date_candidates
+from .date_scanner import scan_dates, parse_date, choose_date, DateCandidate, MESES
 from .normalize_date_for_tipo import normalize_date_for_tipo
 from .parse_posible_date import parse_possible_date
 
 __all__ = [
     "extract_final_date",
+    "extract_final_date_scored",
+    "extract_date_candidates",
+    "scan_dates",
+    "parse_date",
+    "choose_date",
+    "DateCandidate",
+    "MESES",
     "normalize_date_for_tipo",
     "parse_possible_date"
 ]
\ No newline at end of file
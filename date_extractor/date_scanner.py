@@ -0,0 +1,113 @@
+"""
+Acha as datas de um texto numa passada só, sem dateutil no caminho normal.
+
+Como funciona:
+
+  - uma regex pré-compilada com os três formatos aceitos:
+      dd/mm/aaaa (separadores / - . ou espaço; ano com 2 ou 4 dígitos)
+      aaaa-mm-dd
+      "12 de março [de 2024]"
+  - mês por extenso pela tabela MESES (nomes e abreviações em português);
+    palavra que não é mês ("12 de horas") é descartada
+  - datetime montado direto dos inteiros; dia/mês/ano inválidos são descartados
+    (dd/mm com mês > 12 e dia <= 12 é lido como mm/dd, como o dayfirst do dateutil)
+
+Cada candidato sai com a posição no texto original (Document.raw), para
+quem for escolher entre eles. parse_date usa o dateutil (fuzzy) só para
+um texto que não casa com nenhum dos formatos.
+
+Uso:
+    for c in scan_dates(doc):
+        c.data, c.inicio, c.fim, c.texto
+    parse_date("05/03/24")   # datetime(2024, 3, 5)
+"""
+
+import re
+from collections import namedtuple
+from datetime import datetime
+from document import as_document
+from .parse_posible_date import parse_possible_date
+
+MESES = {
+    "janeiro": 1, "jan": 1,
+    "fevereiro": 2, "fev": 2,
+    "marco": 3, "março": 3, "mar": 3,
+    "abril": 4, "abr": 4,
+    "maio": 5, "mai": 5,
+    "junho": 6, "jun": 6,
+    "julho": 7, "jul": 7,
+    "agosto": 8, "ago": 8,
+    "setembro": 9, "set": 9,
+    "outubro": 10, "out": 10,
+    "novembro": 11, "nov": 11,
+    "dezembro": 12, "dez": 12,
+}
+
+_SEP = r"[/\-.\s]"
+_DATE_RE = re.compile(
+    rf"(?<!\d)(?P<ano_ymd>\d{{4}}){_SEP}(?P<mes_ymd>\d{{1,2}}){_SEP}(?P<dia_ymd>\d{{1,2}})(?!\d)"
+    rf"|(?<!\d)(?P<dia>\d{{1,2}}){_SEP}(?P<mes>\d{{1,2}}){_SEP}(?P<ano>\d{{4}}|\d{{2}})(?!\d)"
+    r"|(?<!\d)(?P<dia_ext>\d{1,2})\s+de\s+(?P<mes_ext>[a-zç]+)(?:\s+de\s+(?P<ano_ext>\d{4}))?"
+)
+
+DateCandidate = namedtuple("DateCandidate", "data inicio fim texto fonte")
+
+
+def _full_year(ano: str, hoje: datetime) -> int:
+    y = int(ano)
+    if len(ano) == 2:
+        # mesma janela do dateutil: o século que deixa o ano a até 50 anos de hoje
+        y += hoje.year - hoje.year % 100
+        if y >= hoje.year + 50:
+            y -= 100
+    return y
+
+
+def _build(y, m, d):
+    if m > 12 and d <= 12:
+        m, d = d, m
+    try:
+        return datetime(y, m, d)
+    except ValueError:
+        return None
+
+
+def _from_match(m, hoje):
+    if m.group("ano_ymd"):
+        return _build(int(m.group("ano_ymd")), int(m.group("mes_ymd")), int(m.group("dia_ymd")))
+    if m.group("ano"):
+        return _build(_full_year(m.group("ano"), hoje), int(m.group("mes")), int(m.group("dia")))
+    mes = MESES.get(m.group("mes_ext"))
+    if mes is None:
+        return None
+    ano = int(m.group("ano_ext")) if m.group("ano_ext") else hoje.year
+    return _build(ano, mes, int(m.group("dia_ext")))
+
+
+def scan_dates(text, fonte="texto"):
+    """Datas válidas do texto (Document ou str), em ordem, com posição no texto original."""
+    doc = as_document(text)
+    hoje = datetime.today()
+    found = []
+    for m in _DATE_RE.finditer(doc.lower):
+        dt = _from_match(m, hoje)
+        if dt is None:
+            continue
+        inicio, fim = doc.raw_span("lower", m.start(), m.end())
+        found.append(DateCandidate(dt, inicio, fim, m.group(0), fonte))
+    return found
+
+
+def parse_date(s):
+    """Primeira data de `s`; dateutil (fuzzy) só se nenhum formato conhecido casar."""
+    if not s:
+        return None
+    m = _DATE_RE.search(s.lower())
+    if m is not None:
+        return _from_match(m, datetime.today())
+    return parse_possible_date(s)
+
+
+def choose_date(candidates):
+    """Critério atual: a data mais recente entre os candidatos (None se não houver)."""
+    return max((c.data for c in candidates), default=None)
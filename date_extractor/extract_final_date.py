@@ -1,37 +1,69 @@
 from .normalize_date_for_tipo import normalize_date_for_tipo
-from .parse_posible_date import parse_possible_date
-from utils import extract_date_with_special_ocr
-import re
+from .date_scanner import scan_dates, parse_date, choose_date, DateCandidate
+from utils import extract_date_with_special_ocr, extract_date_with_special_ocr_array
+from document import as_document
 
-def extract_final_date(text, tipo, ocr_image_path=None):
+def extract_final_date(text, tipo, ocr_image_path=None, ocr_image=None):
+    return extract_final_date_scored(text, tipo, ocr_image_path, ocr_image)[0]
 
-    found = []
 
-    # 1) OCR dedicado para datas
-    if ocr_image_path:
+def extract_date_candidates(text, ocr_image_path=None, ocr_image=None):
+    """
+    Todas as datas candidatas: as do OCR dedicado (fonte "ocr_data", sem
+    posição) seguidas das do texto (fonte "texto", posição em Document.raw).
+    """
+    # 1) OCR dedicado para datas (array em memória tem prioridade sobre o caminho)
+    ocr_dates = []
+    if ocr_image is not None:
+        ocr_dates = extract_date_with_special_ocr_array(ocr_image)
+    elif ocr_image_path:
         ocr_dates = extract_date_with_special_ocr(ocr_image_path)
-        for raw in ocr_dates:
-            dt = parse_possible_date(raw)
-            if dt:
-                found.append(dt)
-
-    # 2) Regex no texto principal
-    date_patterns = [
-        r'\d{1,2}[\/\-\.\s]\d{1,2}[\/\-\.\s]\d{2,4}',
-        r'\d{4}[\/\-\.\s]\d{1,2}[\/\-\.\s]\d{1,2}',
-        r'\d{1,2}\s+de\s+[a-zç]+(?:\s+de\s+\d{4})?'
-    ]
-
-    for patt in date_patterns:
-        for m in re.finditer(patt, text.lower()):
-            dt = parse_possible_date(m.group(0))
-            if dt:
-                found.append(dt)
+    candidates = []
+    for raw in ocr_dates:
+        dt = parse_date(raw)
+        if dt:
+            candidates.append(DateCandidate(dt, -1, -1, raw, "ocr_data"))
+
+    # 2) Scanner no texto principal (uma passada, sem dateutil)
+    candidates += scan_dates(as_document(text))
+    return candidates
+
+
+def _confianca(candidates, final_dt, tipo):
+    """
+    Confiança da data escolhida pelas datas que a confirmam (mesma data depois
+    de normalize_date_for_tipo):
+      - OCR dedicado e texto concordam                       -> 1.0
+      - 2+ candidatos concordam e nenhum outro discorda      -> 1.0
+      - 2+ candidatos concordam, mas há datas diferentes     -> 0.7
+      - só o OCR dedicado achou (uma data só)                -> 0.6
+      - um candidato isolado no texto, ou em disputa         -> 0.4
+    """
+    apoio = [c for c in candidates if normalize_date_for_tipo(c.data, tipo) == final_dt]
+    fontes = {c.fonte for c in apoio}
+    if {"ocr_data", "texto"} <= fontes:
+        return 1.0
+    if len(apoio) >= 2:
+        return 1.0 if len(apoio) == len(candidates) else 0.7
+    if len(candidates) == 1 and "ocr_data" in fontes:
+        return 0.6
+    return 0.4
+
+
+def extract_final_date_scored(text, tipo, ocr_image_path=None, ocr_image=None):
+    """
+    Retorna (data "dd-mm-aaaa", confiança 0–1).
+    Confiança 0 quando nenhuma data foi encontrada (data padrão do tipo);
+    1 só quando candidatos diferentes confirmam a mesma data (ver _confianca).
+    `text`: Document ou str.
+    """
+    candidates = extract_date_candidates(text, ocr_image_path, ocr_image)
+    best = choose_date(candidates)
 
     # 3) Fallback
-    if not found:
+    if best is None:
         dt = normalize_date_for_tipo(None, tipo)
-        return dt.strftime("%d-%m-%Y")
+        return dt.strftime("%d-%m-%Y"), 0.0
 
-    final_dt = normalize_date_for_tipo(max(found), tipo)
-    return final_dt.strftime("%d-%m-%Y")
+    final_dt = normalize_date_for_tipo(best, tipo)
+    return final_dt.strftime("%d-%m-%Y"), _confianca(candidates, final_dt, tipo)
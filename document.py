@@ -0,0 +1,186 @@
+"""
+Texto de um documento e as visões normalizadas que os extratores consultam.
+
+Cada visão é calculada UMA vez, na primeira vez que alguém pede, e guardada:
+
+  raw               -> texto como veio do OCR/camada de texto
+  lower             -> raw.lower()                         (datas)
+  normalized        -> sem acento + minúsculo              (= utils.normalize_text; tipo/motivo)
+  simple            -> só [a-z0-9] e espaços simples       (= normalize_text_simple; nomes)
+  name_clean        -> limpar_ruido_name(raw)              (pipeline de nomes)
+  name_clean_simple -> normalize_text_simple(name_clean)
+  keywords          -> varredura das regras de regras.py   (keyword_rules)
+
+`lower`, `normalized` e `simple` guardam o mapa de posições de volta para
+`raw`: uma posição achada numa visão vira posição no texto original
+(raw_offset / raw_span), igual para todos os estágios.
+
+Com as páginas (PageText do utils), o documento também responde em que
+página está uma posição e quais palavras/caixas do OCR ele tem.
+
+Os extratores aceitam Document ou str (as_document); strings iguais
+reaproveitam o mesmo Document.
+
+Uso:
+    doc = Document.from_pages(page_texts)
+    doc.normalized, doc.simple
+    s, e = doc.raw_span("normalized", 10, 18)
+    doc.page_at(s)
+"""
+
+import unicodedata
+from bisect import bisect_right
+from functools import cached_property, lru_cache
+
+
+def _fold_normalized(c):
+    if c.isascii():
+        return c.lower()
+    return "".join(d for d in unicodedata.normalize("NFD", c)
+                   if unicodedata.category(d) != "Mn").lower()
+
+
+def _fold_ascii(c):
+    if c.isascii():
+        return c.lower()
+    return unicodedata.normalize("NFD", c).encode("ascii", "ignore").decode("ascii").lower()
+
+
+def _per_char(raw, fold):
+    """Aplica `fold` caractere a caractere: (texto, posição em raw de cada caractere)."""
+    out, offsets = [], []
+    for i, c in enumerate(raw):
+        f = fold(c)
+        out.append(f)
+        offsets.extend([i] * len(f))
+    return "".join(out), offsets
+
+
+def _simple_with_offsets(raw):
+    """normalize_text_simple com mapa: fora de [a-z0-9] vira separador, colapsado e aparado."""
+    out, offsets = [], []
+    sep = None          # posição do primeiro separador pendente
+    for i, c in enumerate(raw):
+        for ch in _fold_ascii(c):
+            if ch.isalnum():
+                if sep is not None and out:
+                    out.append(" ")
+                    offsets.append(sep)
+                sep = None
+                out.append(ch)
+                offsets.append(i)
+            elif sep is None:
+                sep = i
+    return "".join(out), offsets
+
+
+class Document:
+    def __init__(self, raw: str, pages=None, page_starts=None):
+        self.raw = raw or ""
+        self.pages = list(pages) if pages is not None else []
+        self.page_starts = page_starts   # início de cada página em `raw` (from_pages)
+
+    @classmethod
+    def from_pages(cls, pages, sep=""):
+        """Documento com o texto das páginas concatenado, sabendo onde cada uma começa."""
+        starts, parts, pos = [], [], 0
+        for p in pages:
+            starts.append(pos)
+            parts.append(p.text)
+            pos += len(p.text) + len(sep)
+        return cls(sep.join(parts), pages=pages, page_starts=starts)
+
+    # -----------------------------------------------------------
+    # Visões (memoizadas)
+    # -----------------------------------------------------------
+    @cached_property
+    def _lower(self):
+        lower = self.raw.lower()
+        if len(lower) == len(self.raw):
+            return lower, None       # mapa identidade
+        return _per_char(self.raw, str.lower)
+
+    @cached_property
+    def _normalized(self):
+        return _per_char(self.raw, _fold_normalized)
+
+    @cached_property
+    def _simple(self):
+        return _simple_with_offsets(self.raw)
+
+    @property
+    def lower(self) -> str:
+        return self._lower[0]
+
+    @property
+    def normalized(self) -> str:
+        return self._normalized[0]
+
+    @property
+    def simple(self) -> str:
+        return self._simple[0]
+
+    @cached_property
+    def name_clean(self) -> str:
+        from name_extractor.clean_text import limpar_ruido_name
+        return limpar_ruido_name(self.raw)
+
+    @cached_property
+    def name_clean_simple(self) -> str:
+        from name_extractor.clean_text import normalize_text_simple
+        return normalize_text_simple(self.name_clean)
+
+    @cached_property
+    def keywords(self):
+        """KeywordScan das regras de regras.py sobre `normalized` (tipo e motivo)."""
+        from keyword_rules import get_scanner
+        return get_scanner().scan(self.normalized)
+
+    # -----------------------------------------------------------
+    # Posições
+    # -----------------------------------------------------------
+    def raw_offset(self, view: str, pos: int) -> int:
+        """Posição `pos` da visão ("lower", "normalized", "simple") -> posição em raw."""
+        text, offsets = getattr(self, "_" + view)
+        if offsets is None:
+            return pos
+        if pos >= len(offsets):
+            return len(self.raw)
+        return offsets[pos]
+
+    def raw_span(self, view: str, start: int, end: int):
+        """Trecho [start, end) da visão -> (início, fim) em raw."""
+        if end <= start:
+            s = self.raw_offset(view, start)
+            return s, s
+        return self.raw_offset(view, start), self.raw_offset(view, end - 1) + 1
+
+    def page_at(self, raw_pos: int):
+        """Índice (0-based, do PageText) da página que contém `raw_pos`; None sem páginas."""
+        if not self.page_starts:
+            return None
+        k = bisect_right(self.page_starts, raw_pos) - 1
+        return self.pages[max(0, k)].index
+
+    @property
+    def words(self):
+        """Palavras do OCR (OcrWord, com caixa e confiança) de todas as páginas OCRizadas."""
+        return [w for p in self.pages if getattr(p, "ocr", None) is not None for w in p.ocr.words]
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __str__(self):
+        return self.raw
+
+
+@lru_cache(maxsize=8)
+def _document_for(text: str) -> Document:
+    return Document(text)
+
+
+def as_document(text) -> Document:
+    """Document como veio, ou o Document (memoizado) de uma string."""
+    if isinstance(text, Document):
+        return text
+    return _document_for(text or "")
@@ -1,18 +1,21 @@
-from utils import normalize_text
+from keyword_rules import scan_document, raw_matches
+from regras import MOTIVO_RULES, MOTIVO_PADRAO
 
 def extract_motivo(text):
-    t = normalize_text(text)
-    if "celular" in t:
-        return "CELULAR"
-    elif "distracao" in t or "distra" in t:
-        return "DISTRACAO"
-    elif "cinto" in t:
-        return "CINTO"
-    elif "velocidade" in t:
-        return "VELOCIDADE"
-    elif "drogas" in t or "fumando" in t or "bebendo" in t:
-        return "DROGAS"
-    elif "jornada" in t:
-        return "JORNADA"
-    else:
-        return "INTRAJORNADA"
\ No newline at end of file
+    return classify_motivo(text)["motivo"]
+
+
+def classify_motivo(text):
+    """
+    Motivo pela regra de maior peso encontrada (regras.MOTIVO_RULES), com as
+    ocorrências por regra e as posições no texto original. `text`: Document ou str.
+    """
+    scan = scan_document(text)
+    _, regras = scan.score(MOTIVO_RULES)
+    encontradas = [r for r in MOTIVO_RULES if r.nome in regras]
+    motivo = max(encontradas, key=lambda r: r.peso).classe if encontradas else MOTIVO_PADRAO
+    return {
+        "motivo": motivo,
+        "regras": regras,
+        "posicoes": raw_matches(text, MOTIVO_RULES),
+    }
@@ -1,7 +1,8 @@
 import traceback
-from name_extractor import setup_name_pipeline, extract_name
+from name_extractor import setup_name_pipeline, extract_name, extract_name_scored, prepare_name_embeddings
 from config import NER_MODEL_PATH
 from motoristas import motoristas
+from nlp_loader import get_model, load_hf_ner_stage
 # ---------------- EXTRAÇÃO DE NOME (INTEGRAÇÃO COM name_extractor) ----------------
 
 # O import e setup do pipeline devem ocorrer depois de definir 'motoristas'
@@ -13,14 +14,36 @@ try:
 except NameError:
     name_extractor_fn = None
 
-# Inicializa pipeline do name_extractor (usa seu NER custom se fornecido)
-try:
-    nlp_name, phrase_matcher, ruler, emb_model, emb_matrix, hf_ner = setup_name_pipeline(motoristas, nlp_model_path=NER_MODEL_PATH)
-    print(f"✅ name_extractor pipeline inicializada (modelo: {NER_MODEL_PATH})")
-except Exception as e:
-    print(f"⚠️ Falha ao inicializar name_extractor pipeline: {e}")
-    traceback.print_exc()
-    nlp_name = phrase_matcher = ruler = emb_model = emb_matrix = None
+
+def _build_name_pipeline():
+    # Inicializa pipeline do name_extractor (usa seu NER custom se fornecido)
+    try:
+        pipeline_objs = setup_name_pipeline(motoristas, nlp_model_path=NER_MODEL_PATH)
+        print(f"✅ name_extractor pipeline inicializada (modelo: {NER_MODEL_PATH})")
+        return pipeline_objs
+    except Exception as e:
+        print(f"⚠️ Falha ao inicializar name_extractor pipeline: {e}")
+        traceback.print_exc()
+        return None, None, None, None, None, None, None, None
+
+
+def prepare_name_pipeline():
+    """
+    Chamado no processo principal antes de criar o Pool: grava o cache de
+    embeddings do roster uma vez, em vez de cada worker codificar o roster.
+    """
+    try:
+        prepare_name_embeddings(motoristas)
+    except Exception as e:
+        print(f"⚠️ Falha ao preparar o cache de embeddings: {e}")
+
+
+def get_name_pipeline():
+    """
+    spaCy + matchers + embeddings, montados na primeira extração de nome do
+    worker (não mais no import) e reaproveitados pelo resto do processo.
+    """
+    return get_model("name_pipeline", _build_name_pipeline)
 
 
 def extract_name_pipeline(text):
@@ -28,17 +51,27 @@ def extract_name_pipeline(text):
     Wrapper que chama a função extract_name do módulo name_extractor com os objetos do pipeline.
     Retorna nome do motorista (exato da lista) ou 'DESCONHECIDO'.
     """
+    return extract_name_pipeline_scored(text)[0]
+
+
+def extract_name_pipeline_scored(text):
+    """Igual a extract_name_pipeline, mas retorna (nome, confiança 0–1). `text`: Document ou str."""
     try:
         if name_extractor_fn is None:
             print("⚠️ Função name_extractor não encontrada. Retornando DESCONHECIDO.")
-            return "DESCONHECIDO"
-        return name_extractor_fn(text, motoristas,
-                                 nlp=nlp_name,
-                                 phrase_matcher=phrase_matcher,
-                                 ruler=ruler,
-                                 embed_model=emb_model,
-                                 embed_matrix=emb_matrix)
+            return "DESCONHECIDO", 0.0
+        (nlp_name, phrase_matcher, ruler, emb_model, emb_matrix,
+         hf_ner, driver_index, embed_matcher) = get_name_pipeline()
+        return extract_name_scored(text, motoristas,
+                                   nlp=nlp_name,
+                                   phrase_matcher=phrase_matcher,
+                                   ruler=ruler,
+                                   embed_model=emb_model,
+                                   embed_matrix=emb_matrix,
+                                   index=driver_index,
+                                   embed_matcher=embed_matcher,
+                                   hf_ner=load_hf_ner_stage())
     except Exception as e:
         print(f"❌ Erro no extract_name_pipeline: {e}")
         traceback.print_exc()
-        return "DESCONHECIDO"
\ No newline at end of file
+        return "DESCONHECIDO", 0.0
@@ -1,8 +1,33 @@
 import re
-from utils import normalize_text
+from document import as_document
+from keyword_rules import raw_matches
+from regras import TIPO_RULES
+
+_HORARIO = re.compile(r"\d{1,2}[:h]\d{2}")
+
 
 def extract_tipo(text, orientation, num_pages):
-    t = normalize_text(text)
+    return extract_tipo_scored(text, orientation, num_pages)[0]
+
+
+def extract_tipo_scored(text, orientation, num_pages):
+    """
+    Retorna (tipo, confiança 0–1). A confiança é a margem entre o melhor
+    e o segundo melhor score, relativa ao melhor.
+    """
+    r = classify_tipo(text, orientation, num_pages)
+    return r["tipo"], r["confianca"]
+
+
+def classify_tipo(text, orientation, num_pages):
+    """
+    Classificação completa: tipo, confiança, score por classe, ocorrências
+    por regra (regras.TIPO_RULES + estruturais) e posições das palavras-chave
+    no texto original. `text`: Document ou str.
+    """
+    doc = as_document(text)
+    scan = doc.keywords
+    t = doc.normalized
 
     # Scores
     score = {
@@ -12,42 +37,31 @@ def extract_tipo(text, orientation, num_pages):
         "carta": 0
     }
 
-    # 1) Palavras-chave de Forte Evidência
-    if "atestado" in t or "cid" in t or "dr" in t or "consultorio" in t:
-        score["atestado"] += 40
-
-    if "advertencia" in t or "intrajornada" in t or "descumprimento" in t or "advertido" in t:
-        score["advertencia"] += 40
-
-    if "prezado" in t or "venho por meio desta" in t or "ao senhor" in t:
-        score["carta"] += 40
-
-    if "registro de ponto" in t or "diario de bordo" in t or "horas" in t or "Controle de Jornada" in t:
-        score["ponto"] += 40
+    # 1) + 3) Palavras-chave (tabela em regras.py, uma passada no texto)
+    keywords, regras = scan.score(TIPO_RULES)
+    for classe, pontos in keywords.items():
+        score[classe] += pontos
 
     # 2) Estrutura do Documento
     if num_pages > 1:
         score["ponto"] += 30
+        regras["multipagina"] = num_pages
 
-    numeros = len(re.findall(r"\d{1,2}[:h]\d{2}", t))
+    numeros = len(_HORARIO.findall(t))
     if numeros >= 5:
         score["ponto"] += 40
+        regras["horarios"] = numeros
 
     # verificar presença de padrões horários/tabulares comuns
-    linhas = t.count("00:00:00") + t.count("00:00")
+    linhas = scan.count("00:00:00") + scan.count("00:00")
     if linhas >= 3:
         score["ponto"] += 20
+        regras["zeros"] = linhas
 
-    if len(text.split("\n")) < 10 and len(text) > 400:
+    if doc.raw.count("\n") + 1 < 10 and len(doc.raw) > 400:
         score["advertencia"] += 10
         score["carta"] += 10
-
-    if any(k in t for k in ["colaborador", "conduta", "motivo", "notificado", "empresa"]):
-        score["advertencia"] += 20
-
-    # 3) Indícios médios
-    if any(k in t for k in ["compareceu", "afastamento", "atend", "clinica", "medico", "cid"]):
-        score["atestado"] += 15
+        regras["texto_corrido"] = 1
 
     # 4) Orientação da página (último recurso)
     if orientation == "horizontal":
@@ -58,5 +72,14 @@ def extract_tipo(text, orientation, num_pages):
     # 5) Decisão Final
     tipo_final = max(score, key=score.get)
     if score[tipo_final] < 20:
-        return "desconhecido"
-    return tipo_final
\ No newline at end of file
+        tipo_final, confianca = "desconhecido", 0.0
+    else:
+        segundo = sorted(score.values(), reverse=True)[1]
+        confianca = (score[tipo_final] - segundo) / score[tipo_final]
+    return {
+        "tipo": tipo_final,
+        "confianca": confianca,
+        "scores": score,
+        "regras": regras,
+        "posicoes": raw_matches(doc, TIPO_RULES),
+    }
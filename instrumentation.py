@@ -0,0 +1,217 @@
+import os
+import sys
+import json
+import time
+import importlib.util
+from collections import defaultdict
+from config import METRICS_PATH
+
+# ---------------- INSTRUMENTAÇÃO ----------------
+# Por documento (no worker): tempo de parede e de CPU de cada etapa do
+# process_pdf, contadores (páginas renderizadas, chamadas ao Tesseract,
+# acertos do cache de OCR...) e pico de memória (RSS) do processo.
+# No processo principal: uma linha JSON por documento em METRICS_PATH e um
+# resumo da execução com percentis por etapa.
+#
+# Os módulos de OCR só chamam `count("...")` / `add_time("...", s)`; sem
+# documento em andamento (uso avulso) a chamada não faz nada.
+
+_HAS_PYINSTRUMENT = importlib.util.find_spec("pyinstrument") is not None
+
+_CURRENT = None
+
+
+def peak_rss_mb():
+    """Pico de memória residente do processo atual, em MB (None se não der para medir)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux devolve KB, macOS devolve bytes
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+class DocMetrics:
+    """Métricas de um documento. `mark(etapa)` fecha a etapa que terminou agora."""
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.etapas = {}
+        self.contadores = defaultdict(int)
+        self.operacoes = defaultdict(float)   # segundos por operação (ex.: preproc_denoise)
+        self._inicio_wall = self._ultimo_wall = time.perf_counter()
+        self._inicio_cpu = self._ultimo_cpu = time.process_time()
+
+    def mark(self, etapa):
+        wall, cpu = time.perf_counter(), time.process_time()
+        anterior = self.etapas.get(etapa, {"wall": 0.0, "cpu": 0.0})
+        self.etapas[etapa] = {
+            "wall": round(anterior["wall"] + wall - self._ultimo_wall, 4),
+            "cpu": round(anterior["cpu"] + cpu - self._ultimo_cpu, 4),
+        }
+        self._ultimo_wall, self._ultimo_cpu = wall, cpu
+
+    def count(self, nome, n=1):
+        self.contadores[nome] += n
+
+    def add_time(self, nome, segundos):
+        self.operacoes[nome] += segundos
+
+    def tempos(self):
+        """{etapa: segundos de parede} (formato gravado no diário)."""
+        return {etapa: t["wall"] for etapa, t in self.etapas.items()}
+
+    def to_dict(self):
+        return {
+            "arquivo": self.arquivo,
+            "pid": os.getpid(),
+            "etapas": self.etapas,
+            "total": {
+                "wall": round(time.perf_counter() - self._inicio_wall, 4),
+                "cpu": round(time.process_time() - self._inicio_cpu, 4),
+            },
+            "contadores": dict(self.contadores),
+            "operacoes": {k: round(v, 4) for k, v in self.operacoes.items()},
+            "pico_rss_mb": peak_rss_mb(),
+        }
+
+
+def begin(arquivo):
+    """Abre as métricas do documento que o worker vai processar."""
+    global _CURRENT
+    _CURRENT = DocMetrics(arquivo)
+    return _CURRENT
+
+
+def end():
+    """Fecha o documento atual e devolve o dict de métricas."""
+    global _CURRENT
+    metrics, _CURRENT = _CURRENT, None
+    return metrics.to_dict() if metrics is not None else None
+
+
+def count(nome, n=1):
+    if _CURRENT is not None:
+        _CURRENT.count(nome, n)
+
+
+def add_time(nome, segundos):
+    if _CURRENT is not None:
+        _CURRENT.add_time(nome, segundos)
+
+
+# ---------------- RESUMO DA EXECUÇÃO (processo principal) ----------------
+def _percentile(values, q):
+    """Percentil por posição mais próxima (values já ordenado)."""
+    if not values:
+        return 0.0
+    k = max(0, min(len(values) - 1, int(round(q / 100.0 * len(values) + 0.5)) - 1))
+    return values[k]
+
+
+class RunSummary:
+    """Junta as métricas que voltam dos workers e grava uma linha JSON por documento."""
+
+    def __init__(self, path=METRICS_PATH):
+        self.path = path
+        self.docs = 0
+        self.wall = defaultdict(list)
+        self.cpu = defaultdict(list)
+        self.contadores = defaultdict(int)
+        self.operacoes = defaultdict(float)
+        self.pico_rss_mb = 0.0
+        self._inicio = time.perf_counter()
+        self._file = open(path, "a", encoding="utf-8") if path else None
+
+    def add(self, metrics):
+        if not metrics:
+            return
+        self.docs += 1
+        for etapa, t in list(metrics["etapas"].items()) + [("total", metrics["total"])]:
+            self.wall[etapa].append(t["wall"])
+            self.cpu[etapa].append(t["cpu"])
+        for nome, n in metrics["contadores"].items():
+            self.contadores[nome] += n
+        for nome, s in metrics.get("operacoes", {}).items():
+            self.operacoes[nome] += s
+        self.pico_rss_mb = max(self.pico_rss_mb, metrics.get("pico_rss_mb") or 0.0)
+        if self._file is not None:
+            self._file.write(json.dumps(metrics, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def report(self):
+        """Dict com percentis (p50/p90/p99/máx) de parede e CPU por etapa."""
+        etapas = {}
+        for etapa, walls in self.wall.items():
+            walls, cpus = sorted(walls), sorted(self.cpu[etapa])
+            etapas[etapa] = {
+                "p50": _percentile(walls, 50), "p90": _percentile(walls, 90),
+                "p99": _percentile(walls, 99), "max": walls[-1],
+                "soma": round(sum(walls), 3), "cpu_soma": round(sum(cpus), 3),
+            }
+        elapsed = time.perf_counter() - self._inicio
+        return {
+            "documentos": self.docs,
+            "segundos": round(elapsed, 2),
+            "docs_por_segundo": round(self.docs / elapsed, 3) if elapsed else 0.0,
+            "etapas": etapas,
+            "contadores": dict(self.contadores),
+            "operacoes": {k: round(v, 3) for k, v in self.operacoes.items()},
+            "pico_rss_mb": self.pico_rss_mb,
+        }
+
+    def print_report(self):
+        rep = self.report()
+        if not rep["documentos"]:
+            return
+        print(f"\n📊 {rep['documentos']} documento(s) em {rep['segundos']}s "
+              f"({rep['docs_por_segundo']} docs/s) | pico RSS {rep['pico_rss_mb']} MB")
+        print(f"{'etapa':<18}{'p50':>8}{'p90':>8}{'p99':>8}{'máx':>8}{'soma':>10}{'cpu':>10}")
+        for etapa, t in sorted(rep["etapas"].items(), key=lambda e: -e[1]["soma"]):
+            print(f"{etapa:<18}{t['p50']:>8.2f}{t['p90']:>8.2f}{t['p99']:>8.2f}"
+                  f"{t['max']:>8.2f}{t['soma']:>10.1f}{t['cpu_soma']:>10.1f}")
+        if rep["contadores"]:
+            print("🔢 " + ", ".join(f"{k}={v}" for k, v in sorted(rep["contadores"].items())))
+        if rep["operacoes"]:
+            print("⏱️ " + ", ".join(f"{k}={v:.1f}s" for k, v in
+                                    sorted(rep["operacoes"].items(), key=lambda o: -o[1])))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# ---------------- PERFIL DE UM DOCUMENTO ----------------
+def profile_call(fn, *args, out_path=None):
+    """
+    Roda fn(*args) sob pyinstrument (se instalado) ou cProfile e mostra onde
+    o tempo foi gasto. Com cProfile, `out_path` recebe o .prof (snakeviz etc.).
+    """
+    if _HAS_PYINSTRUMENT:
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+        try:
+            return fn(*args)
+        finally:
+            profiler.stop()
+            print(profiler.output_text(unicode=True, color=False))
+
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args)
+    finally:
+        if out_path:
+            profiler.dump_stats(out_path)
+            print(f"💾 Perfil gravado em {out_path}")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(30)
@@ -0,0 +1,107 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from config import JOURNAL_PATH, JOURNAL_MAX_RETRIES
+
+# ---------------- DIÁRIO DE PROCESSAMENTO ----------------
+# SQLite indexado pelo hash do conteúdo do PDF. Guarda status, campos
+# extraídos, tempos por etapa e o nome final, para que uma nova execução
+# pule o que já foi feito (mesmo depois do rename) e só refaça as falhas.
+
+STATUS_OK = "ok"
+STATUS_ERRO = "erro"
+STATUS_ANDAMENTO = "em_andamento"   # ficou assim = execução interrompida
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documentos (
+    hash          TEXT PRIMARY KEY,
+    arquivo       TEXT,
+    status        TEXT,
+    tipo          TEXT,
+    nome          TEXT,
+    data          TEXT,
+    motivo        TEXT,
+    novo_nome     TEXT,
+    erro          TEXT,
+    tempos        TEXT,
+    tentativas    INTEGER DEFAULT 0,
+    atualizado_em REAL
+)
+"""
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 do conteúdo do arquivo (não depende do nome)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Journal:
+    """
+    Acesso ao diário. Usado só pelo processo principal (callbacks do Pool
+    rodam em outro thread, por isso o lock).
+    """
+
+    def __init__(self, path=JOURNAL_PATH, max_retries=JOURNAL_MAX_RETRIES):
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def get(self, doc_hash):
+        with self._lock:
+            cur = self._conn.execute("SELECT * FROM documentos WHERE hash = ?", (doc_hash,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            return dict(zip([c[0] for c in cur.description], row))
+
+    def should_process(self, doc_hash):
+        """False quando o documento já terminou com sucesso ou esgotou as tentativas."""
+        entry = self.get(doc_hash)
+        if entry is None:
+            return True
+        if entry["status"] == STATUS_OK:
+            return False
+        return (entry["tentativas"] or 0) < self.max_retries
+
+    def start(self, doc_hash, arquivo):
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO documentos (hash, arquivo, status, tentativas, atualizado_em)
+                   VALUES (?, ?, ?, 1, ?)
+                   ON CONFLICT(hash) DO UPDATE SET
+                       arquivo = excluded.arquivo, status = excluded.status,
+                       tentativas = documentos.tentativas + 1,
+                       atualizado_em = excluded.atualizado_em""",
+                (doc_hash, arquivo, STATUS_ANDAMENTO, time.time()))
+            self._conn.commit()
+
+    def finish(self, doc_hash, result):
+        """Grava o dict devolvido por process_pdf."""
+        with self._lock:
+            self._conn.execute(
+                """UPDATE documentos SET status = ?, tipo = ?, nome = ?, data = ?, motivo = ?,
+                       novo_nome = ?, erro = ?, tempos = ?, atualizado_em = ?
+                   WHERE hash = ?""",
+                (result.get("status", STATUS_ERRO), result.get("tipo"), result.get("nome"),
+                 result.get("data"), result.get("motivo"), result.get("novo_nome"),
+                 result.get("erro"), json.dumps(result.get("tempos") or {}),
+                 time.time(), doc_hash))
+            self._conn.commit()
+
+    def summary(self):
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM documentos GROUP BY status").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,173 @@
+import importlib.util
+from collections import namedtuple, deque, defaultdict
+from functools import lru_cache
+from document import as_document
+
+# ---------------- REGRAS DE PALAVRAS-CHAVE ----------------
+# As tabelas de regras (regras.py) viram UM autômato de Aho-Corasick com todas
+# as palavras de todos os classificadores. Uma passada linear sobre o texto
+# normalizado acha todas as ocorrências, com posição; extract_tipo e
+# extract_motivo só somam pesos sobre esse resultado. Custo por documento não
+# cresce com o número de palavras-chave.
+#
+# Usa pyahocorasick (C) se estiver instalado; senão o autômato em Python puro.
+#
+#   scan = scan_document(doc)               # normaliza + varre, uma vez por Document
+#   scan.count("00:00")                     # ocorrências (sem sobreposição, como str.count)
+#   scan.positions["celular"]               # [início, ...] no texto normalizado
+#   scores, hits = scan.score(TIPO_RULES)   # {classe: soma}, {regra: ocorrências}
+
+_HAS_AHOCORASICK = importlib.util.find_spec("ahocorasick") is not None
+
+Rule = namedtuple("Rule", "nome classe peso palavras inteiras", defaults=((),))
+
+
+class KeywordAutomaton:
+    """Aho-Corasick: todas as ocorrências de várias palavras numa passada."""
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keywords))
+        self._lengths = [len(k) for k in self.keywords]
+        if _HAS_AHOCORASICK:
+            import ahocorasick
+            self._native = ahocorasick.Automaton()
+            for kid, kw in enumerate(self.keywords):
+                self._native.add_word(kw, kid)
+            if self.keywords:
+                self._native.make_automaton()
+            return
+        self._native = None
+        self._build()
+
+    def _build(self):
+        goto, fail, out = [{}], [0], [[]]
+        for kid, kw in enumerate(self.keywords):
+            s = 0
+            for ch in kw:
+                nxt = goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[s][ch] = nxt
+                    goto.append({})
+                    fail.append(0)
+                    out.append([])
+                s = nxt
+            out[s].append(kid)
+
+        # links de falha em largura (filhos da raiz falham para a raiz)
+        queue = deque(goto[0].values())
+        while queue:
+            s = queue.popleft()
+            for ch, t in goto[s].items():
+                queue.append(t)
+                f = fail[s]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[t] = goto[f].get(ch, 0)
+                out[t] = out[t] + out[fail[t]]
+        self._goto, self._fail, self._out = goto, fail, out
+
+    def iter(self, text):
+        """(início, id da palavra) de cada ocorrência, em ordem de fim."""
+        if not self.keywords:
+            return
+        if self._native is not None:
+            for end, kid in self._native.iter(text):
+                yield end - self._lengths[kid] + 1, kid
+            return
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        s = 0
+        for i, ch in enumerate(text):
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            for kid in out[s]:
+                yield i - lengths[kid] + 1, kid
+
+
+def _is_word(text, start, end):
+    return ((start == 0 or not text[start - 1].isalnum())
+            and (end >= len(text) or not text[end].isalnum()))
+
+
+class KeywordScan:
+    """Ocorrências de todas as palavras-chave num texto normalizado."""
+
+    def __init__(self, text, positions):
+        self.text = text
+        self.positions = positions   # palavra -> [início, ...] sem sobreposição
+
+    def count(self, keyword, inteira=False):
+        starts = self.positions.get(keyword, ())
+        if not inteira:
+            return len(starts)
+        n = len(keyword)
+        return sum(1 for p in starts if _is_word(self.text, p, p + n))
+
+    def rule_hits(self, rule):
+        """Ocorrências de todas as palavras da regra."""
+        return (sum(self.count(k) for k in rule.palavras)
+                + sum(self.count(k, inteira=True) for k in rule.inteiras))
+
+    def score(self, rules):
+        """({classe: soma dos pesos das regras encontradas}, {regra: ocorrências})."""
+        scores, hits = defaultdict(int), {}
+        for rule in rules:
+            n = self.rule_hits(rule)
+            if n:
+                hits[rule.nome] = n
+                scores[rule.classe] += rule.peso
+        return dict(scores), hits
+
+    def matches(self, rules):
+        """{regra: [(início, palavra), ...]} — onde cada regra casou no texto normalizado."""
+        found = {}
+        for rule in rules:
+            spots = [(p, k) for k in rule.palavras for p in self.positions.get(k, ())]
+            spots += [(p, k) for k in rule.inteiras for p in self.positions.get(k, ())
+                      if _is_word(self.text, p, p + len(k))]
+            if spots:
+                found[rule.nome] = sorted(spots)
+        return found
+
+
+class KeywordScanner:
+    """Palavras de várias tabelas de regras compiladas num autômato só."""
+
+    def __init__(self, *tabelas, extras=()):
+        keywords = [k for regras in tabelas for r in regras for k in (*r.palavras, *r.inteiras)]
+        self.automaton = KeywordAutomaton(keywords + list(extras))
+
+    def scan(self, normalized_text) -> KeywordScan:
+        keywords = self.automaton.keywords
+        positions = defaultdict(list)
+        last_end = {}
+        for start, kid in sorted(self.automaton.iter(normalized_text)):
+            kw = keywords[kid]
+            if start < last_end.get(kid, 0):
+                continue   # sobreposta à anterior da mesma palavra (semântica de str.count)
+            positions[kw].append(start)
+            last_end[kid] = start + len(kw)
+        return KeywordScan(normalized_text, dict(positions))
+
+
+@lru_cache(maxsize=1)
+def get_scanner() -> KeywordScanner:
+    """Autômato com as regras de regras.py, montado uma vez por processo."""
+    from regras import TIPO_RULES, MOTIVO_RULES, TIPO_CONTAGENS
+    return KeywordScanner(TIPO_RULES, MOTIVO_RULES, extras=TIPO_CONTAGENS)
+
+
+def scan_document(text) -> KeywordScan:
+    """
+    Varredura do Document (ou str) — feita uma vez por documento e guardada
+    nele; extract_tipo e extract_motivo reaproveitam o resultado.
+    """
+    return as_document(text).keywords
+
+
+def raw_matches(text, rules):
+    """Como KeywordScan.matches, mas com as posições no texto ORIGINAL do documento."""
+    doc = as_document(text)
+    return {nome: [(doc.raw_offset("normalized", p), k) for p, k in spots]
+            for nome, spots in doc.keywords.matches(rules).items()}
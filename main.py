@@ -1,34 +1,276 @@
 import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+from functools import partial
 
 # ---------------- CONFIGURAÇÕES (ajuste conforme seu ambiente) ----------------
-from config import INPUT_FOLDER
+from config import (INPUT_FOLDER, HF_NER_MODE, MAX_IN_FLIGHT, MAX_TASKS_PER_CHILD,
+                    WATCH_INTERVAL, PAGE_SPLIT_MIN_PAGES, BENCH_SAMPLE, BENCH_WORKERS,
+                    BENCH_THREADS)
 
 # ---------------- PROCESSAMENTO ----------------
-from process import process_pdf
+from process import process_pdf, ocr_page
+from utils import get_num_pages, PageText, FONTE_VAZIA
+from nlp_loader import init_worker
+from extract_name_pipeline import prepare_name_pipeline
+from ner_service import start_ner_service, stop_ner_service
+from concurrency import plan_workers, apply_thread_budget, run_thread_benchmark, print_benchmark
+from journal import Journal, file_hash, STATUS_ERRO
+from instrumentation import RunSummary, profile_call
 
 # ---------------- MAIN ----------------
 import multiprocessing
 
-def main():
-    pdf_files = [f for f in os.listdir(INPUT_FOLDER) if f.lower().endswith(".pdf")]
-    if not pdf_files:
+
+def list_new_pdfs(folder, seen, sizes):
+    """
+    PDFs da pasta ainda não enviados. Um arquivo só é liberado quando o
+    tamanho dele não mudou desde a última varredura (cópia terminou).
+    """
+    novos = []
+    for f in sorted(os.listdir(folder)):
+        if not f.lower().endswith(".pdf") or f in seen:
+            continue
+        try:
+            size = os.path.getsize(os.path.join(folder, f))
+        except OSError:
+            continue
+        if sizes.get(f) == size:
+            novos.append(f)
+            sizes.pop(f, None)
+        else:
+            sizes[f] = size
+    return novos
+
+
+class StreamingScheduler:
+    """
+    Envia PDFs ao Pool com no máximo `max_in_flight` tarefas pendentes
+    (backpressure) e trata cada resultado assim que ele termina.
+
+    Dois níveis: documentos com PAGE_SPLIT_MIN_PAGES páginas ou mais viram
+    uma tarefa de OCR por página (ocr_page), espalhadas pelo Pool; quando a
+    última página termina, o texto é remontado em ordem e process_pdf roda
+    com ele, sem refazer o OCR.
+    """
+
+    def __init__(self, pool, max_in_flight, journal=None, summary=None):
+        self.pool = pool
+        self.journal = journal
+        self.summary = summary
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.done = 0
+        self.seen = set()   # nomes já enviados ou gerados pelo rename
+        self.docs = {}      # documentos divididos: arquivo -> páginas concluídas
+
+    def _finished(self, doc_hash, result):
+        if self.journal is not None and doc_hash:
+            self.journal.finish(doc_hash, result or {"status": STATUS_ERRO})
+        if self.summary is not None and result:
+            self.summary.add(result.get("metricas"))
+        with self.lock:
+            self.pending -= 1
+            self.done += 1
+            if result and result.get("novo_nome"):
+                self.seen.add(result["novo_nome"])
+        status = (result or {}).get("status", "erro")
+        print(f"📬 [{self.done}] {(result or {}).get('arquivo')} -> {status}", flush=True)
+        self.slots.release()
+
+    def _failed(self, doc_hash, exc):
+        print(f"❌ Tarefa falhou: {exc}", flush=True)
+        if self.journal is not None and doc_hash:
+            self.journal.finish(doc_hash, {"status": STATUS_ERRO, "erro": str(exc)})
+        with self.lock:
+            self.pending -= 1
+            self.done += 1
+        self.slots.release()
+
+    def submit(self, file):
+        path = os.path.join(INPUT_FOLDER, file)
+        doc_hash = None
+        if self.journal is not None:
+            try:
+                doc_hash = file_hash(path)
+            except OSError as e:
+                print(f"⚠️ Não foi possível ler {file}: {e}")
+                return
+            if not self.journal.should_process(doc_hash):
+                with self.lock:
+                    self.seen.add(file)
+                print(f"⏭️ {file}: já processado (diário), pulando.", flush=True)
+                return
+            self.journal.start(doc_hash, file)
+
+        if PAGE_SPLIT_MIN_PAGES:
+            num_pages = get_num_pages(path)
+            if num_pages >= PAGE_SPLIT_MIN_PAGES:
+                self._submit_pages(file, num_pages, doc_hash)
+                return
+
+        self.slots.acquire()   # bloqueia quando há tarefas demais em andamento
+        with self.lock:
+            self.seen.add(file)
+            self.pending += 1
+        self.pool.apply_async(process_pdf, (file,),
+                              callback=partial(self._finished, doc_hash),
+                              error_callback=partial(self._failed, doc_hash))
+
+    def _submit_pages(self, file, num_pages, doc_hash=None):
+        print(f"📚 {file}: {num_pages} páginas divididas entre os workers", flush=True)
+        with self.lock:
+            self.seen.add(file)
+            self.docs[file] = {"left": num_pages, "pages": [], "hash": doc_hash}
+        for i in range(num_pages):
+            self.slots.acquire()
+            with self.lock:
+                self.pending += 1
+            self.pool.apply_async(ocr_page, (file, i),
+                                  callback=partial(self._page_done, file),
+                                  error_callback=partial(self._page_failed, file, i))
+
+    def _page_done(self, file, page):
+        with self.lock:
+            doc = self.docs[file]
+            doc["pages"].append(page)
+            doc["left"] -= 1
+            last = doc["left"] == 0
+            if last:
+                del self.docs[file]
+        if last:
+            # a vaga da última página passa para a tarefa do documento
+            # (não bloqueia o thread de callbacks do Pool)
+            self.pool.apply_async(process_pdf, (file, doc["pages"]),
+                                  callback=partial(self._finished, doc["hash"]),
+                                  error_callback=partial(self._failed, doc["hash"]))
+        else:
+            with self.lock:
+                self.pending -= 1
+            self.slots.release()
+
+    def _page_failed(self, file, page_index, exc):
+        print(f"⚠️ OCR da página {page_index + 1} de {file} falhou: {exc}", flush=True)
+        self._page_done(file, PageText(page_index, FONTE_VAZIA, "", None))
+
+    def wait(self):
+        while True:
+            with self.lock:
+                if self.pending == 0:
+                    return
+            time.sleep(0.2)
+
+
+def main(watch=False):
+    if not watch and not any(f.lower().endswith(".pdf") for f in os.listdir(INPUT_FOLDER)):
         print("Nenhum PDF encontrado em:", INPUT_FOLDER)
         return
 
     print(f"\n🚀 Iniciando processamento EM PARALELO usando todos os núcleos...\n")
 
     num_cpus = multiprocessing.cpu_count()
-    print(f"🧠 Núcleos detectados: {num_cpus}")
+    workers, threads = plan_workers()
+    print(f"🧠 Núcleos detectados: {num_cpus} | workers: {workers} x {threads} thread(s)")
+    apply_thread_budget(threads)
 
     # Adaptar para nuvem
     multiprocessing.freeze_support()  # Necessário no Windows
 
-    # Pool recebe como argumento a função e a lista de PDFs
-    with multiprocessing.Pool(processes=num_cpus) as pool:
-        pool.map(process_pdf, pdf_files)
+    # NER em processo dedicado: os workers só mandam texto e recebem entidades
+    ner_proc = ner_queue = None
+    if HF_NER_MODE == "service":
+        ner_proc, ner_queue = start_ner_service()
+        print(f"🧠 Serviço de NER iniciado (pid {ner_proc.pid})")
+
+    # diário (SQLite por hash do conteúdo): reexecuções pulam o que já foi concluído
+    journal = Journal()
+    # métricas por documento (JSON lines) + resumo com percentis ao final
+    summary = RunSummary()
+
+    # embeddings do roster codificados aqui, uma vez, e não por worker ao mesmo tempo
+    prepare_name_pipeline()
+
+    # init_worker: modelos carregados uma vez por worker, sob demanda (ver config.PRELOAD_MODELS)
+    # maxtasksperchild: recicla workers para devolver memória ao SO em execuções longas
+    try:
+        with multiprocessing.Pool(processes=workers, initializer=init_worker,
+                                  initargs=(None, ner_queue, threads),
+                                  maxtasksperchild=MAX_TASKS_PER_CHILD) as pool:
+            scheduler = StreamingScheduler(pool, MAX_IN_FLIGHT or 2 * workers,
+                                           journal=journal, summary=summary)
+            sizes = {}
+            if watch:
+                # a pasta pode já ter um PDF no meio da cópia: a primeira varredura
+                # só registra os tamanhos e a seguinte libera os que não mudaram
+                for f in list_new_pdfs(INPUT_FOLDER, scheduler.seen, sizes):
+                    scheduler.submit(f)
+            else:
+                # execução única: arquivos já parados na pasta entram direto
+                for f in sorted(os.listdir(INPUT_FOLDER)):
+                    if f.lower().endswith(".pdf"):
+                        scheduler.submit(f)
+
+            if watch:
+                print(f"👀 Observando {INPUT_FOLDER} (a cada {WATCH_INTERVAL}s). Ctrl+C para sair.")
+                try:
+                    while True:
+                        time.sleep(WATCH_INTERVAL)
+                        for f in list_new_pdfs(INPUT_FOLDER, scheduler.seen, sizes):
+                            scheduler.submit(f)
+                except KeyboardInterrupt:
+                    print("\n⏹️ Encerrando: aguardando tarefas em andamento...")
+
+            scheduler.wait()
+    finally:
+        if ner_proc is not None:
+            stop_ner_service(ner_proc, ner_queue)
+        print(f"📒 Diário: {journal.summary()}")
+        journal.close()
+        summary.print_report()
+        summary.close()
 
     print("\n✅ Processamento concluído (Paralelo)!")
 
 
+def bench():
+    """Varre combinações workers x threads numa amostra da INPUT_FOLDER e mostra docs/s."""
+    files = sorted(os.path.join(INPUT_FOLDER, f) for f in os.listdir(INPUT_FOLDER)
+                   if f.lower().endswith(".pdf"))[:BENCH_SAMPLE]
+    if not files:
+        print("Nenhum PDF encontrado em:", INPUT_FOLDER)
+        return
+    cores = multiprocessing.cpu_count()
+    workers_options = BENCH_WORKERS or sorted({cores, max(1, cores // 2), max(1, cores // 4)},
+                                              reverse=True)
+    print(f"📊 Benchmark com {len(files)} PDFs: workers={workers_options} threads={BENCH_THREADS}")
+    print_benchmark(run_thread_benchmark(files, workers_options, BENCH_THREADS))
+
+
+def profile(file):
+    """
+    Perfil detalhado (pyinstrument ou cProfile) de UM documento, rodado neste
+    processo sobre uma cópia (process_pdf renomeia o arquivo).
+    """
+    src = file if os.path.isabs(file) else os.path.join(INPUT_FOLDER, file)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        copy = os.path.join(tmpdir, os.path.basename(src))
+        shutil.copy2(src, copy)
+        out = os.path.splitext(os.path.basename(src))[0] + ".prof"
+        result = profile_call(process_pdf, copy, out_path=out)
+    summary = RunSummary(path=None)
+    summary.add(result.get("metricas"))
+    summary.print_report()
+
+
 if __name__ == "__main__":
-    main()
+    if "--bench" in sys.argv[1:]:
+        bench()
+    elif "--profile" in sys.argv[1:]:
+        # python main.py --profile arquivo.pdf
+        profile(sys.argv[sys.argv.index("--profile") + 1])
+    else:
+        main(watch="--watch" in sys.argv[1:])
@@ -1,6 +1,12 @@
-from .extract_name import setup_name_pipeline, extract_name
+from .extract_name import setup_name_pipeline, extract_name, extract_name_scored, prepare_name_embeddings
+from .driver_index import DriverIndex
+from .embedding_matcher import EmbeddingMatcher
 
 __all__ = [
     "setup_name_pipeline",
     "extract_name",
+    "extract_name_scored",
+    "prepare_name_embeddings",
+    "DriverIndex",
+    "EmbeddingMatcher",
 ]
@@ -0,0 +1,87 @@
+# === file: name_extractor/driver_index.py ===
+from collections import defaultdict
+from rapidfuzz import process as rf_process, fuzz as rf_fuzz
+from .clean_text import normalize_text_simple
+
+
+class DriverIndex:
+    """
+    Índice do roster de motoristas, montado UMA vez (setup_name_pipeline) e
+    consultado por todas as etapas do extract_name:
+
+      names_norm  -> nomes normalizados, na mesma ordem do roster
+      by_code     -> código -> motorista
+      by_norm     -> nome normalizado -> posição no roster
+      by_token    -> primeiro/último nome -> posições no roster
+
+    As buscas devolvem a POSIÇÃO do motorista (não o texto), então nomes
+    repetidos não são mais resolvidos com `list.index`.
+    """
+
+    def __init__(self, motoristas):
+        self.motoristas = list(motoristas)
+        self.names_norm = [normalize_text_simple(_nome(m)) for m in self.motoristas]
+
+        self.by_code = {}
+        self.by_norm = {}
+        self.by_token = defaultdict(set)
+        for i, (m, norm) in enumerate(zip(self.motoristas, self.names_norm)):
+            if isinstance(m, (list, tuple)) and len(m) > 1:
+                self.by_code.setdefault(str(m[0]).strip(), m)
+            self.by_norm.setdefault(norm, i)
+            parts = norm.split()
+            if parts:
+                self.by_token[parts[0]].add(i)
+                self.by_token[parts[-1]].add(i)
+
+    def __len__(self):
+        return len(self.motoristas)
+
+    def __getitem__(self, i):
+        return self.motoristas[i]
+
+    def find_code(self, codigo):
+        """Motorista com o código exato ou None."""
+        if codigo is None:
+            return None
+        return self.by_code.get(str(codigo).strip())
+
+    def find_exact(self, text):
+        """Posição do motorista cujo nome normalizado é igual a `text`, ou None."""
+        return self.by_norm.get(normalize_text_simple(text))
+
+    def candidates(self, text_norm):
+        """Posições dos motoristas que compartilham primeiro/último nome com o texto."""
+        found = set()
+        for tok in text_norm.split():
+            found |= self.by_token.get(tok, set())
+        return found
+
+    def fuzzy(self, text_norm, threshold, scorer=rf_fuzz.token_set_ratio, restrict=False):
+        """
+        Melhor posição com score >= threshold, ou None.
+        restrict=True tenta primeiro só os candidatos do índice invertido.
+        """
+        return self.fuzzy_scored(text_norm, threshold, scorer=scorer, restrict=restrict)[0]
+
+    def fuzzy_scored(self, text_norm, threshold, scorer=rf_fuzz.token_set_ratio, restrict=False):
+        """Como fuzzy(), mas retorna (posição, score 0–100) ou (None, 0.0)."""
+        if not text_norm or not self.names_norm:
+            return None, 0.0
+
+        if restrict:
+            cand = self.candidates(text_norm)
+            if cand:
+                choices = {i: self.names_norm[i] for i in cand}
+                res = rf_process.extractOne(text_norm, choices, scorer=scorer, score_cutoff=threshold)
+                if res:
+                    return res[2], res[1]
+
+        res = rf_process.extractOne(text_norm, self.names_norm, scorer=scorer, score_cutoff=threshold)
+        return (res[2], res[1]) if res else (None, 0.0)
+
+
+def _nome(m):
+    if isinstance(m, (list, tuple)):
+        return m[1]
+    return str(m)
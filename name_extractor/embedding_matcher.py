@@ -0,0 +1,100 @@
+# === file: name_extractor/embedding_matcher.py ===
+import numpy as np
+from config import EMBED_SIM_THRESHOLD
+from .clean_text import normalize_text_simple
+
+MIN_SPAN_TOKENS = 2
+MAX_SPAN_TOKENS = 4
+# limite de spans por matmul (spans x motoristas float32)
+SPAN_CHUNK = 2048
+
+
+def build_spans(text, min_n=MIN_SPAN_TOKENS, max_n=MAX_SPAN_TOKENS):
+    """
+    Janelas de 2–4 tokens do texto normalizado (sem números), na ordem em
+    que aparecem e sem repetição. Nomes no roster têm 2+ palavras, então
+    palavras isoladas não entram.
+    """
+    tokens = [t for t in normalize_text_simple(text).split()
+              if len(t) > 1 and not any(c.isdigit() for c in t)]
+    seen = set()
+    spans = []
+    for n in range(min_n, max_n + 1):
+        for i in range(len(tokens) - n + 1):
+            span = " ".join(tokens[i:i + n])
+            if span not in seen:
+                seen.add(span)
+                spans.append(span)
+    return spans
+
+
+class EmbeddingMatcher:
+    """
+    Casamento por embeddings contra a matriz do roster.
+
+    A matriz já vem normalizada (normalize_embeddings=True); ela só é
+    renormalizada aqui se não estiver, e uma única vez. Os spans de todos
+    os documentos são codificados em um único batch e pontuados com uma
+    multiplicação de matrizes.
+    """
+
+    def __init__(self, model, matrix, threshold=EMBED_SIM_THRESHOLD, batch_size=64):
+        self.model = model
+        self.threshold = threshold
+        self.batch_size = batch_size
+
+        m = np.asarray(matrix, dtype=np.float32)
+        norms = np.linalg.norm(m, axis=1)
+        if len(norms) and not np.allclose(norms, 1.0, atol=1e-3):
+            m = m / np.maximum(norms, 1e-12)[:, None]
+        self._matrix_t = m.T
+
+    def _encode(self, spans):
+        return self.model.encode(spans, batch_size=self.batch_size, convert_to_numpy=True,
+                                 normalize_embeddings=True).astype(np.float32, copy=False)
+
+    def match_many(self, texts, top_k=1):
+        """
+        Para cada texto, devolve até `top_k` tuplas (posição no roster, score, span),
+        do maior para o menor score, somente acima do threshold.
+        """
+        doc_spans = [build_spans(t) for t in texts]
+
+        # spans únicos entre todos os documentos -> um único encode
+        uniq = {}
+        for spans in doc_spans:
+            for s in spans:
+                uniq.setdefault(s, len(uniq))
+        if not uniq or self._matrix_t.shape[1] == 0:
+            return [[] for _ in texts]
+
+        all_spans = list(uniq)
+        best_row = np.empty(len(all_spans), dtype=np.int64)
+        best_score = np.empty(len(all_spans), dtype=np.float32)
+        for start in range(0, len(all_spans), SPAN_CHUNK):
+            chunk = all_spans[start:start + SPAN_CHUNK]
+            sims = self._encode(chunk) @ self._matrix_t
+            rows = sims.argmax(axis=1)
+            best_row[start:start + len(chunk)] = rows
+            best_score[start:start + len(chunk)] = sims[np.arange(len(chunk)), rows]
+
+        results = []
+        for spans in doc_spans:
+            if not spans:
+                results.append([])
+                continue
+            idx = np.fromiter((uniq[s] for s in spans), dtype=np.int64, count=len(spans))
+            scores = best_score[idx]
+            k = min(top_k, len(idx))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            results.append([
+                (int(best_row[idx[j]]), float(scores[j]), spans[j])
+                for j in top if scores[j] >= self.threshold
+            ])
+        return results
+
+    def match(self, text):
+        """Melhor (posição, score, span) para um texto, ou None."""
+        res = self.match_many([text])[0]
+        return res[0] if res else None
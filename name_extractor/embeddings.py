@@ -1,15 +1,158 @@
+import os
+import json
+import glob
+import hashlib
+import importlib.util
 import numpy as np
+from config import EMBED_CACHE_DIR, EMBED_CACHE_FILENAME
 
-try:
-    from sentence_transformers import SentenceTransformer
-    _HAS_ST = True
-except ImportError:
-    _HAS_ST = False
+# só verifica a disponibilidade; o modelo é importado/carregado sob demanda (nlp_loader)
+_HAS_ST = importlib.util.find_spec("sentence_transformers") is not None
 
-def load_or_build_embeddings(motoristas):
+EMBED_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+
+# ==============================
+#   Cache em disco (content-addressed)
+# ==============================
+# <EMBED_CACHE_FILENAME>-<modelo>-<hash do roster>.npy  -> matriz float32 (mmap, somente leitura)
+# <EMBED_CACHE_FILENAME>-<modelo>-<hash do roster>.json -> chaves (hash de cada nome) por linha
+
+
+def _name_key(nome):
+    return hashlib.sha1(nome.encode("utf-8")).hexdigest()
+
+
+def _cache_prefix(cache_dir, model_name):
+    slug = "".join(c if c.isalnum() else "_" for c in model_name)
+    return os.path.join(cache_dir, f"{EMBED_CACHE_FILENAME}-{slug}")
+
+
+def _roster_hash(keys, model_name):
+    h = hashlib.sha1(model_name.encode("utf-8"))
+    for k in keys:
+        h.update(k.encode("ascii"))
+    return h.hexdigest()[:16]
+
+
+def _load_cached(npy_path, meta_path):
+    """Abre a matriz em modo mmap (compartilhada entre workers pelo page cache do SO)."""
+    with open(meta_path, "r", encoding="utf-8") as f:
+        keys = json.load(f)["keys"]
+    return keys, np.load(npy_path, mmap_mode="r")
+
+
+def _previous_rows(prefix, exclude):
+    """Linhas já calculadas em qualquer cache anterior do mesmo modelo: {chave: vetor}."""
+    rows = {}
+    metas = sorted(glob.glob(prefix + "-*.json"), key=os.path.getmtime, reverse=True)
+    for meta_path in metas:
+        npy_path = meta_path[:-5] + ".npy"
+        if npy_path == exclude or not os.path.exists(npy_path):
+            continue
+        try:
+            keys, mat = _load_cached(npy_path, meta_path)
+        except Exception:
+            continue
+        for i, k in enumerate(keys):
+            rows.setdefault(k, mat[i])
+    return rows
+
+
+def _save_atomic(npy_path, meta_path, keys, emb):
+    # grava em arquivos temporários e troca de uma vez (workers podem estar lendo)
+    tmp_npy = f"{npy_path}.{os.getpid()}.tmp.npy"
+    tmp_meta = f"{meta_path}.{os.getpid()}.tmp"
+    np.save(tmp_npy, emb)
+    with open(tmp_meta, "w", encoding="utf-8") as f:
+        json.dump({"keys": keys}, f)
+    os.replace(tmp_npy, npy_path)
+    os.replace(tmp_meta, meta_path)
+
+
+def _remove_stale(prefix, keep):
+    for path in glob.glob(prefix + "-*.npy") + glob.glob(prefix + "-*.json"):
+        # *.tmp.npy é a gravação em andamento de outro processo (antes do os.replace)
+        if path.endswith(".tmp.npy"):
+            continue
+        if os.path.splitext(path)[0] != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _cache_paths(keys, model_name, cache_dir):
+    prefix = _cache_prefix(cache_dir, model_name)
+    base = f"{prefix}-{_roster_hash(keys, model_name)}"
+    return prefix, base, base + ".npy", base + ".json"
+
+
+def _fresh_cache(npy_path, meta_path, keys):
+    """Matriz do cache se ele existe e bate com o roster atual; senão None."""
+    if os.path.exists(npy_path) and os.path.exists(meta_path):
+        try:
+            cached_keys, emb = _load_cached(npy_path, meta_path)
+            if cached_keys == keys:
+                return emb
+        except Exception:
+            pass
+    return None
+
+
+def ensure_embedding_cache(motoristas, model_name=EMBED_MODEL, cache_dir=EMBED_CACHE_DIR):
+    """
+    Deixa o .npy do roster pronto no processo principal, antes de criar o Pool.
+    Sem isso, com o cache frio (ou roster alterado) cada worker codificaria o
+    roster inteiro ao mesmo tempo. Com o cache em dia, nem carrega o modelo.
+    """
+    if not _HAS_ST:
+        return
+    keys = [_name_key(n) for n in motoristas]
+    _, _, npy_path, meta_path = _cache_paths(keys, model_name, cache_dir)
+    if _fresh_cache(npy_path, meta_path, keys) is None:
+        load_or_build_embeddings(motoristas, model_name, cache_dir)
+
+
+def load_or_build_embeddings(motoristas, model_name=EMBED_MODEL, cache_dir=EMBED_CACHE_DIR):
+    """
+    Retorna (modelo, matriz normalizada) para a lista de nomes `motoristas`.
+    A matriz vem do cache em disco quando o roster não mudou; se mudou, só os
+    nomes novos/alterados são codificados e o cache é regravado.
+    """
     if not _HAS_ST:
         return None, None
 
-    model = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
-    emb = model.encode(motoristas, convert_to_numpy=True, normalize_embeddings=True)
-    return model, emb
+    # modelo compartilhado pelo processo (carregado uma única vez por worker)
+    from nlp_loader import load_embed_model
+    model = load_embed_model(model_name)
+
+    keys = [_name_key(n) for n in motoristas]
+    prefix, base, npy_path, meta_path = _cache_paths(keys, model_name, cache_dir)
+
+    emb = _fresh_cache(npy_path, meta_path, keys)
+    if emb is not None:
+        return model, emb
+
+    rows = _previous_rows(prefix, exclude=npy_path)
+    missing = [i for i, k in enumerate(keys) if k not in rows]
+
+    dim = model.get_sentence_embedding_dimension()
+    emb = np.empty((len(keys), dim), dtype=np.float32)
+    if missing:
+        print(f"🧮 Codificando {len(missing)} de {len(keys)} motoristas (cache de embeddings)")
+        new = model.encode([motoristas[i] for i in missing], convert_to_numpy=True,
+                           normalize_embeddings=True)
+        for j, i in enumerate(missing):
+            emb[i] = new[j]
+    for i, k in enumerate(keys):
+        if k in rows:
+            emb[i] = rows[k]
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        _save_atomic(npy_path, meta_path, keys, emb)
+        _remove_stale(prefix, keep=base)
+        return model, np.load(npy_path, mmap_mode="r")
+    except Exception as e:
+        print(f"⚠️ Não foi possível gravar o cache de embeddings: {e}")
+        return model, emb
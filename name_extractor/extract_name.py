@@ -3,24 +3,26 @@ import spacy
 import re
 import numpy as np
 from typing import List, Optional
-from rapidfuzz import process as rf_process, fuzz as rf_fuzz
-from .clean_text import normalize_text_simple, limpar_ruido_name
+from .clean_text import normalize_text_simple
 from .matcher import build_spacy_matchers
-from .embeddings import load_or_build_embeddings, _HAS_ST
+from .embeddings import load_or_build_embeddings, ensure_embedding_cache, _HAS_ST
+from .driver_index import DriverIndex
+from .embedding_matcher import EmbeddingMatcher
 # No topo de name_extractor/extract_name.py
 import spacy
 import re
 import numpy as np
-from config import NER_MODEL_PATH
+from config import NER_MODEL_PATH, EMBED_SIM_THRESHOLD
+from document import as_document
 from typing import List, Optional
 # ... outras importações ...
 
 # IMPORTAÇÕES ADICIONAIS NECESSÁRIAS:
-try:
-    from transformers import AutoModelForTokenClassification, AutoTokenizer
-    import torch
+# (só verifica a disponibilidade; transformers/torch são importados ao carregar o modelo)
+import importlib.util
+if importlib.util.find_spec("transformers") and importlib.util.find_spec("torch"):
     _HAS_HF = True
-except ImportError:
+else:
     # Se as bibliotecas não estiverem instaladas, defina um flag e o modelo como None
     print("AVISO: Bibliotecas 'transformers' e 'torch' não encontradas. O NER do HuggingFace será desativado.")
     _HAS_HF = False
@@ -28,7 +30,6 @@ except ImportError:
 # CONFIG
 # ==============
 FUZZY_THRESHOLD = 97
-EMBED_SIM_THRESHOLD = 0.93
 
 
 # ==============================
@@ -95,36 +96,36 @@ def detectar_codigo(text):
 # ==============================
 #   Pipeline setup
 # ==============================
-def load_hf_ner(model_path: str = "marcosgg/bert-base-pt-ner-enamex"):
+def load_hf_ner(model_path: str = NER_MODEL_PATH):
     """
-    Carrega o modelo BERT/NER do HuggingFace.
+    Carrega o modelo BERT/NER do HuggingFace pelo registro de modelos do processo
+    (nlp_loader), então chamadas repetidas não recarregam o BERT.
     Retorna (model, tokenizer) ou (None, None) em caso de falha.
     """
     if not _HAS_HF:
         return None, None
 
-    print(f"Carregando modelo HuggingFace NER: {model_path}...")
-    
     try:
-        # Carrega o Tokenizer (necessário para pré-processar o texto para o BERT)
-        tokenizer = AutoTokenizer.from_pretrained(model_path)
-        
-        # Carrega o Modelo (específico para a tarefa de Token Classification/NER)
-        model = AutoModelForTokenClassification.from_pretrained(model_path)
-        
-        # Define o modo de avaliação
-        model.eval()
-        
-        # Retorna o modelo e o tokenizer
-        return model, tokenizer
-        
+        from nlp_loader import load_hf_ner_parts
+        return load_hf_ner_parts()
     except Exception as e:
         print(f"ERRO ao carregar o modelo HuggingFace: {e}")
         return None, None
-def setup_name_pipeline(motoristas: List[str], nlp_model_path: Optional[str] = None) -> tuple:
+def prepare_name_embeddings(motoristas: List[str]) -> None:
+    """
+    Monta o cache de embeddings do roster uma vez, no processo principal,
+    antes do Pool (os workers só abrem o .npy pronto).
+    """
+    ensure_embedding_cache(DriverIndex(motoristas).names_norm)
+
+
+def setup_name_pipeline(motoristas: List[str], nlp_model_path: Optional[str] = None,
+                        load_hf: bool = False) -> tuple:
     """
     Configura pipeline de NER com Hugging Face + spaCy + embeddings.
-    Retorna: nlp_name, phrase_matcher, ruler, embed_model, embed_matrix, hf_ner
+    O BERT só é carregado com load_hf=True (nenhum estágio atual o consome).
+    Retorna: nlp_name, phrase_matcher, ruler, embed_model, embed_matrix, hf_ner,
+             driver_index, embed_matcher
     """
 
     # Carrega SpaCy
@@ -160,38 +161,51 @@ def setup_name_pipeline(motoristas: List[str], nlp_model_path: Optional[str] = N
     if patterns:
         ruler_pipe.add_patterns(patterns)
 
+    # Índice do roster (nomes normalizados, códigos, primeiro/último nome)
+    driver_index = DriverIndex(motoristas)
+
     # Embeddings
-    motoristas_norm = [normalize_text_simple(m[1]) for m in motoristas]
-    embed_model, embed_matrix = None, None
+    embed_model, embed_matrix, embed_matcher = None, None, None
 
     if _HAS_ST:
         try:
-            embed_model, embed_matrix = load_or_build_embeddings(motoristas_norm)
+            embed_model, embed_matrix = load_or_build_embeddings(driver_index.names_norm)
+            embed_matcher = EmbeddingMatcher(embed_model, embed_matrix, threshold=EMBED_SIM_THRESHOLD)
         except:
             pass
 
-    # HuggingFace NER
-    hf_ner = load_hf_ner()  # ← GARANTE A EXISTÊNCIA
+    # HuggingFace NER (sob demanda)
+    hf_ner = load_hf_ner() if load_hf else (None, None)
 
-    # 🔥 GARANTE RETORNO DE 6 VALORES SEMPRE
-    return nlp, phrase_matcher, ruler, embed_model, embed_matrix, hf_ner
+    # 🔥 GARANTE RETORNO DE 8 VALORES SEMPRE
+    return nlp, phrase_matcher, ruler, embed_model, embed_matrix, hf_ner, driver_index, embed_matcher
 
 
 # ==============================
 #  Pipeline principal reduzido e limpo
 # ==============================
-def _pipeline_extract(text, motoristas, nlp, phrase_matcher, embed_model, embed_matrix):
+def _pipeline_extract(text, motoristas, nlp, phrase_matcher, embed_model, embed_matrix,
+                      index=None, embed_matcher=None, hf_ner=None):
     """
     Tenta:
     1) PhraseMatcher
-    2) spaCy NER
+    2) spaCy NER (+ NER HuggingFace, se `hf_ner` for passado)
     3) Fuzzy
     4) Embeddings
     """
-    text_orig = text or ""
-    text = limpar_ruido_name(text_orig)
+    return _pipeline_extract_scored(text, motoristas, nlp, phrase_matcher, embed_model,
+                                    embed_matrix, index, embed_matcher, hf_ner)[0]
 
-    noms = [normalize_text_simple(m[1]) for m in motoristas]
+
+def _pipeline_extract_scored(text, motoristas, nlp, phrase_matcher, embed_model, embed_matrix,
+                             index=None, embed_matcher=None, hf_ner=None):
+    """Mesmas etapas de _pipeline_extract; retorna (motorista, confiança 0–1) ou (None, 0.0)."""
+    doc = as_document(text)
+    text_orig = doc.raw
+    text = doc.name_clean
+
+    if index is None:
+        index = DriverIndex(motoristas)
 
     # 1) PhraseMatcher
     if phrase_matcher and nlp:
@@ -199,9 +213,9 @@ def _pipeline_extract(text, motoristas, nlp, phrase_matcher, embed_model, embed_
         matches = phrase_matcher(doc)
         if matches:
             span = doc[matches[0][1]:matches[0][2]].text.strip()
-            norm = normalize_text_simple(span)
-            if norm in noms:
-                return motoristas[noms.index(norm)]
+            i = index.find_exact(span)
+            if i is not None:
+                return index[i], 1.0
 
     # 2) spaCy NER
     if nlp:
@@ -209,28 +223,38 @@ def _pipeline_extract(text, motoristas, nlp, phrase_matcher, embed_model, embed_
         for ent in doc.ents:
             if ent.label_ in ("NOME", "PER", "PERSON"):
                 cand = normalize_text_simple(ent.text)
-                res = rf_process.extractOne(cand, noms, scorer=rf_fuzz.token_set_ratio)
-                if res and res[1] >= FUZZY_THRESHOLD:
-                    return motoristas[noms.index(res[0])]
+                i, score = index.fuzzy_scored(cand, FUZZY_THRESHOLD, restrict=True)
+                if i is not None:
+                    return index[i], score / 100.0
+
+    # 2b) NER HuggingFace (pipeline local ou cliente do ner_service)
+    if hf_ner is not None:
+        try:
+            ents = hf_ner(text_orig)
+        except Exception as e:
+            print(f"⚠️ NER HuggingFace falhou: {e}")
+            ents = []
+        for ent in ents:
+            if ent.get("entity_group") in ("PER", "PESSOA", "PERSON"):
+                i, score = index.fuzzy_scored(normalize_text_simple(ent["word"]), FUZZY_THRESHOLD,
+                                              restrict=True)
+                if i is not None:
+                    return index[i], score / 100.0
 
     # 3) Fuzzy global
-    res = rf_process.extractOne(normalize_text_simple(text), noms, scorer=rf_fuzz.token_set_ratio)
-    if res and res[1] >= FUZZY_THRESHOLD:
-        return motoristas[noms.index(res[0])]
-
-    # 4) Embeddings
-    if _HAS_ST and embed_model is not None and embed_matrix is not None:
-        spans = [s for s in text.split() if len(s) > 3]
-        if spans:
-            vecs = embed_model.encode(spans, convert_to_numpy=True)
-            emb_norm = embed_matrix / np.linalg.norm(embed_matrix, axis=1, keepdims=True)
-            vec_norm = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
-            sims = np.dot(vec_norm, emb_norm.T)
-            best_idx = sims.max(axis=1).argmax()
-            if sims[best_idx].max() >= EMBED_SIM_THRESHOLD:
-                return motoristas[sims[best_idx].argmax()]
+    i, score = index.fuzzy_scored(doc.name_clean_simple, FUZZY_THRESHOLD)
+    if i is not None:
+        return index[i], score / 100.0
 
-    return None
+    # 4) Embeddings (n-gramas de 2–4 tokens, um encode + um matmul)
+    if embed_matcher is None and _HAS_ST and embed_model is not None and embed_matrix is not None:
+        embed_matcher = EmbeddingMatcher(embed_model, embed_matrix, threshold=EMBED_SIM_THRESHOLD)
+    if embed_matcher is not None:
+        best = embed_matcher.match(text)
+        if best:
+            return index[best[0]], best[1]
+
+    return None, 0.0
 
 
 # ==============================
@@ -239,29 +263,46 @@ def _pipeline_extract(text, motoristas, nlp, phrase_matcher, embed_model, embed_
 def extract_name(text, motoristas,
                  nlp=None, phrase_matcher=None, ruler=None,
                  embed_model=None, embed_matrix=None,
-                 is_pdf_path=False):
+                 is_pdf_path=False, index=None, embed_matcher=None, hf_ner=None):
+
+    return extract_name_scored(text, motoristas, nlp=nlp, phrase_matcher=phrase_matcher,
+                               ruler=ruler, embed_model=embed_model, embed_matrix=embed_matrix,
+                               index=index, embed_matcher=embed_matcher, hf_ner=hf_ner)[0]
+
 
-    text_raw = text
+def extract_name_scored(text, motoristas,
+                        nlp=None, phrase_matcher=None, ruler=None,
+                        embed_model=None, embed_matrix=None,
+                        index=None, embed_matcher=None, hf_ner=None):
+    """
+    Igual a extract_name, mas retorna (nome, confiança 0–1).
+    Código/PhraseMatcher = 1.0; fuzzy = score/100; embeddings = similaridade.
+    `text`: Document ou str (as visões normalizadas são calculadas uma vez só).
+    """
+    doc = as_document(text)
+    text_raw = doc.raw
+
+    # Índice pré-montado (setup_name_pipeline); monta na hora só se não foi passado
+    if index is None:
+        index = DriverIndex(motoristas)
 
     # 1) Código primeiro (melhor caminho)
     codigo = detectar_codigo(text_raw)
     if codigo:
-        for cod, nome in motoristas:
-            if cod == codigo:
-                return nome
+        motorista = index.find_code(codigo)
+        if motorista:
+            return motorista[1], 1.0
 
     # 2) Pipeline principal
-    nome = _pipeline_extract(text_raw, motoristas, nlp, phrase_matcher,
-                             embed_model, embed_matrix)
+    nome, score = _pipeline_extract_scored(doc, motoristas, nlp, phrase_matcher,
+                                           embed_model, embed_matrix, index=index,
+                                           embed_matcher=embed_matcher, hf_ner=hf_ner)
     if nome:
-        return nome
+        return nome, score
 
     # 3) Tentativa final: fuzzy estrito sobre texto inteiro
-    nomes_norm = [normalize_text_simple(n) for _, n in motoristas]
-    text_norm = normalize_text_simple(text_raw)
-
-    best = rf_process.extractOne(text_norm, nomes_norm, scorer=rf_fuzz.token_set_ratio)
-    if best and best[1] >= 98:
-        return motoristas[nomes_norm.index(best[0])]
+    i, score = index.fuzzy_scored(doc.simple, 98)
+    if i is not None:
+        return index[i], score / 100.0
 
-    return "DESCONHECIDO"
+    return "DESCONHECIDO", 0.0
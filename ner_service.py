@@ -0,0 +1,181 @@
+import os
+import time
+import queue
+import itertools
+import multiprocessing
+from config import NER_MAX_BATCH_TOKENS, NER_MAX_WAIT_MS, NER_MAX_LENGTH, NER_SERVICE_THREADS
+from concurrency import apply_thread_budget, plan_workers
+
+# ---------------- SERVIÇO DE NER (um processo dono do BERT) ----------------
+# Os workers de OCR não carregam o modelo: mandam o texto por uma fila para
+# este processo, que junta pedidos de vários workers, agrupa por tamanho em
+# tokens (batching dinâmico) e devolve as entidades pelo Pipe de cada worker.
+#
+# Protocolo na fila de pedidos:
+#   ("register", pid, conn)         -> conn = ponta de envio do Pipe do worker
+#   ("ner", pid, req_id, texto)
+#   ("stop",)
+
+
+def _chunk_text(tokenizer, text, max_length):
+    """
+    Quebra o texto em pedaços de até `max_length` tokens (respeitando os
+    offsets de caractere). Retorna [(offset_inicial, trecho, n_tokens)].
+    """
+    enc = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+    offsets = enc["offset_mapping"]
+    if not offsets:
+        return []
+    limit = max_length - 2  # [CLS] + [SEP]
+    chunks = []
+    for start in range(0, len(offsets), limit):
+        window = offsets[start:start + limit]
+        c0, c1 = window[0][0], window[-1][1]
+        chunks.append((c0, text[c0:c1], len(window)))
+    return chunks
+
+
+def _batches_by_tokens(items, max_batch_tokens):
+    """
+    Agrupa pedaços ordenados por tamanho: cada batch respeita
+    n_itens * maior_comprimento <= max_batch_tokens (custo com padding).
+    """
+    items = sorted(items, key=lambda it: it["n_tokens"])
+    batch, longest = [], 0
+    for it in items:
+        new_longest = max(longest, it["n_tokens"] + 2)
+        if batch and new_longest * (len(batch) + 1) > max_batch_tokens:
+            yield batch
+            batch, new_longest = [], it["n_tokens"] + 2
+        batch.append(it)
+        longest = new_longest
+    if batch:
+        yield batch
+
+
+def _serializable(ent, offset):
+    return {
+        "entity_group": ent.get("entity_group", ent.get("entity")),
+        "score": float(ent["score"]),
+        "word": ent["word"],
+        "start": int(ent["start"]) + offset if ent.get("start") is not None else None,
+        "end": int(ent["end"]) + offset if ent.get("end") is not None else None,
+    }
+
+
+def _reply(conns, key, p):
+    """Manda ao worker as entidades de um pedido (ordenadas pela posição no texto)."""
+    pid, req_id = key
+    conn = conns.get(pid)
+    if conn is None:
+        return
+    ents = sorted(p["ents"], key=lambda e: e["start"] or 0)
+    try:
+        conn.send((req_id, ents))
+    except (BrokenPipeError, OSError):
+        conns.pop(pid, None)
+
+
+def run_ner_service(request_q, max_batch_tokens=NER_MAX_BATCH_TOKENS,
+                    max_wait_ms=NER_MAX_WAIT_MS, max_length=NER_MAX_LENGTH):
+    """Loop do processo de NER. Carrega o modelo uma única vez e atende até receber ("stop",)."""
+    from nlp_loader import load_ner_model
+    apply_thread_budget(NER_SERVICE_THREADS or plan_workers()[1])
+    nlp = load_ner_model()
+    tokenizer = nlp.tokenizer
+
+    conns = {}
+    running = True
+    print(f"🧠 Serviço de NER pronto (pid {os.getpid()})", flush=True)
+
+    while running:
+        try:
+            msgs = [request_q.get()]
+        except (EOFError, OSError):
+            break
+
+        # junta o que chegar dentro da janela de espera (batching dinâmico)
+        deadline = time.monotonic() + max_wait_ms / 1000.0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                msgs.append(request_q.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        items, pending = [], {}
+        for msg in msgs:
+            if msg[0] == "register":
+                conns[msg[1]] = msg[2]
+            elif msg[0] == "stop":
+                running = False
+            elif msg[0] == "ner":
+                _, pid, req_id, text = msg
+                chunks = _chunk_text(tokenizer, text or "", max_length)
+                pending[(pid, req_id)] = {"left": len(chunks), "ents": []}
+                for offset, chunk, n_tokens in chunks:
+                    items.append({"key": (pid, req_id), "offset": offset,
+                                  "text": chunk, "n_tokens": n_tokens})
+
+        # texto vazio (nenhum pedaço): responde já
+        for key, p in pending.items():
+            if p["left"] == 0:
+                _reply(conns, key, p)
+
+        # devolve (stream) cada pedido assim que o batch com o seu último pedaço
+        # termina: os batches saem do menor para o maior, então um pedido curto
+        # não espera pelos pedaços de um documento longo da mesma janela
+        for batch in _batches_by_tokens(items, max_batch_tokens):
+            try:
+                outputs = nlp([it["text"] for it in batch], batch_size=len(batch))
+            except Exception as e:
+                print(f"⚠️ Serviço de NER: batch falhou: {e}")
+                outputs = [[] for _ in batch]
+            for it, ents in zip(batch, outputs):
+                p = pending[it["key"]]
+                p["ents"].extend(_serializable(e, it["offset"]) for e in ents)
+                p["left"] -= 1
+                if p["left"] == 0:
+                    _reply(conns, it["key"], p)
+
+
+def start_ner_service():
+    """Sobe o processo de NER. Retorna (processo, fila de pedidos)."""
+    request_q = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=run_ner_service, args=(request_q,),
+                                   name="ner-service", daemon=True)
+    proc.start()
+    return proc, request_q
+
+
+def stop_ner_service(proc, request_q, timeout=10):
+    request_q.put(("stop",))
+    proc.join(timeout)
+    if proc.is_alive():
+        proc.terminate()
+
+
+class NerClient:
+    """
+    Lado do worker: mesma interface de chamada do pipeline HF
+    (`client(texto)` -> lista de entidades), mas sem modelo em memória.
+    """
+
+    def __init__(self, request_q, timeout=120):
+        self.request_q = request_q
+        self.timeout = timeout
+        self._recv, send = multiprocessing.Pipe(duplex=False)
+        self._ids = itertools.count()
+        self.request_q.put(("register", os.getpid(), send))
+
+    def __call__(self, text):
+        req_id = next(self._ids)
+        self.request_q.put(("ner", os.getpid(), req_id, text))
+        while self._recv.poll(self.timeout):
+            got_id, ents = self._recv.recv()
+            if got_id == req_id:
+                return ents
+        print("⚠️ Serviço de NER não respondeu a tempo.")
+        return []
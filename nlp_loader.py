@@ -1,8 +1,117 @@
-from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
-from config import NER_MODEL_PATH
+import os
+import time
+from config import NER_MODEL_PATH, PRELOAD_MODELS, HF_NER_MODE
 
-def load_ner_model():
+# ---------------- REGISTRO DE MODELOS (um por processo) ----------------
+# Cada modelo é carregado no máximo uma vez por worker e só quando algum
+# estágio realmente precisa dele. O tempo de carga fica em LOAD_TIMES.
+
+_MODELS = {}
+LOAD_TIMES = {}
+
+# fila do serviço de NER (HF_NER_MODE == "service"), definida pelo init_worker
+_NER_QUEUE = None
+
+
+def get_model(key, loader):
+    """Retorna o modelo `key`, chamando `loader()` somente na primeira vez neste processo."""
+    if key not in _MODELS:
+        t0 = time.perf_counter()
+        _MODELS[key] = loader()
+        LOAD_TIMES[key] = time.perf_counter() - t0
+        print(f"⏱️ Modelo '{key}' carregado em {LOAD_TIMES[key]:.2f}s (pid {os.getpid()})", flush=True)
+    return _MODELS[key]
+
+
+def _load_hf_parts():
+    from transformers import AutoTokenizer, AutoModelForTokenClassification
+    from concurrency import apply_torch_threads
+    apply_torch_threads()   # torch respeita o orçamento de threads do worker
     tokenizer = AutoTokenizer.from_pretrained(NER_MODEL_PATH)
     model = AutoModelForTokenClassification.from_pretrained(NER_MODEL_PATH)
-    nlp = pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
-    return nlp
+    model.eval()
+    return model, tokenizer
+
+
+def load_hf_ner_parts():
+    """(model, tokenizer) do NER HuggingFace, compartilhados por todo o processo."""
+    return get_model("hf_ner", _load_hf_parts)
+
+
+def load_ner_model():
+    """Pipeline HF de NER (aggregation_strategy='simple') reaproveitando model/tokenizer do registro."""
+    def _build():
+        from transformers import pipeline
+        model, tokenizer = load_hf_ner_parts()
+        return pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
+    return get_model("ner_pipeline", _build)
+
+
+def load_hf_ner_stage():
+    """
+    NER usado pela etapa de extração de nome, conforme HF_NER_MODE:
+    cliente do serviço dedicado, pipeline local ou None (desligado).
+    """
+    if HF_NER_MODE == "service" and _NER_QUEUE is not None:
+        from ner_service import NerClient
+        return get_model("ner_client", lambda: NerClient(_NER_QUEUE))
+    if HF_NER_MODE in ("local", "service"):
+        return load_ner_model()
+    return None
+
+
+def load_embed_model(model_name):
+    def _build():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    return get_model(f"embed:{model_name}", _build)
+
+
+def _preload_ocr_engine():
+    from ocr.engine import get_engine
+    return get_engine()
+
+
+def _preload_name_pipeline():
+    # import tardio: extract_name_pipeline depende deste módulo
+    from extract_name_pipeline import get_name_pipeline
+    return get_name_pipeline()
+
+
+# Pré-carregamento opcional (nomes aceitos em config.PRELOAD_MODELS)
+_PRELOADERS = {
+    "hf_ner": load_hf_ner_parts,
+    "ner_pipeline": load_ner_model,
+    "name_pipeline": _preload_name_pipeline,
+    "ocr_engine": _preload_ocr_engine,
+}
+
+
+def init_worker(preload=None, ner_queue=None, threads=None):
+    """
+    Initializer do multiprocessing.Pool. Por padrão não carrega nada (tudo é
+    preguiçoso); `preload`/PRELOAD_MODELS permite aquecer modelos específicos.
+    `ner_queue` é a fila do serviço de NER, quando ele está ativo.
+    `threads` é o orçamento de threads do worker (ver concurrency.py).
+    """
+    global _NER_QUEUE
+    _NER_QUEUE = ner_queue
+
+    from concurrency import apply_thread_budget, plan_workers
+    apply_thread_budget(threads or plan_workers()[1])
+    t0 = time.perf_counter()
+    for name in (PRELOAD_MODELS if preload is None else preload):
+        loader = _PRELOADERS.get(name)
+        if loader is None:
+            print(f"⚠️ Modelo desconhecido em PRELOAD_MODELS: {name}")
+            continue
+        try:
+            loader()
+        except Exception as e:
+            print(f"⚠️ Falha ao pré-carregar {name}: {e}")
+    LOAD_TIMES["init_worker"] = time.perf_counter() - t0
+
+
+def model_load_report():
+    """Resumo dos tempos de carga deste processo: {modelo: segundos}."""
+    return dict(LOAD_TIMES)
@@ -1,6 +1,25 @@
-from .ocr import ocr_cleaner, ocr_table_detector
+from . import ocr_cleaner, ocr_table_detector
+from .page_cache import PageCache
+from .page_source import open_page_source, FitzPageSource, Pdf2ImagePageSource
+from .ocr_cache import OcrCache, get_ocr_cache
+from .adaptive_ocr import ocr_page_adaptive
+from .engine import get_engine, TesserocrEngine, PytesseractEngine
+from .page_geometry import PageGeometry, estimate_geometry, apply_geometry
 
 __all__ = [
     "ocr_cleaner",
     "ocr_table_detector",
+    "PageCache",
+    "open_page_source",
+    "FitzPageSource",
+    "Pdf2ImagePageSource",
+    "OcrCache",
+    "get_ocr_cache",
+    "ocr_page_adaptive",
+    "get_engine",
+    "TesserocrEngine",
+    "PytesseractEngine",
+    "PageGeometry",
+    "estimate_geometry",
+    "apply_geometry",
 ]
\ No newline at end of file
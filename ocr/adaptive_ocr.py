@@ -0,0 +1,119 @@
+"""
+OCR de página escaneada com DPI adaptativo.
+
+A página é lida primeiro numa resolução baixa (OCR_DPI_LOW) e só volta ao
+Tesseract em resolução maior quando as confianças por palavra mostram que
+precisa:
+
+  1. página inteira em OCR_DPI_LOW (cinza, normalizada pelo PageCache)
+  2. página boa (confiança média >= OCR_MIN_PAGE_CONF, poucas linhas fracas)
+       -> linhas fracas (< OCR_MIN_LINE_CONF) relidas sozinhas em
+          OCR_DPI_STEPS[0] (só o retângulo da linha é renderizado, --psm 7)
+  3. página fraca -> página inteira de novo em cada DPI de OCR_DPI_STEPS até
+     ficar boa; fica a leitura de maior confiança
+
+Carta de impressora a laser limpa para no passo 1 (menos da metade dos
+pixels de 300 DPI); fax ruim chega a 300/400 DPI como antes.
+
+As caixas do OcrPage devolvido ficam nas coordenadas do DPI em `page.dpi`
+(linhas relidas são convertidas de volta para ele).
+
+Uso:
+    page = ocr_page_adaptive(page_cache, 0)
+    page.dpi, page.mean_conf
+"""
+
+from config import (OCR_DPI_LOW, OCR_DPI_STEPS, OCR_MIN_PAGE_CONF, OCR_MIN_LINE_CONF,
+                    OCR_WEAK_LINES_MAX, OCR_MIN_WORDS)
+from instrumentation import count
+from .engine import get_engine
+from .tesseract_tsv import OcrLine, OcrWord, ocr_image_tsv, parse_tsv
+
+_LINE_CONFIG = "--psm 7"
+_LINE_PAD = 0.25      # margem em volta da linha, em alturas de linha
+
+
+def cache_settings() -> str:
+    """
+    Configuração do OCR adaptativo, para a chave do cache de OCR: mudar qualquer
+    limiar ou DPI em config gera outra chave (nada de texto de antes da mudança).
+    """
+    steps = "/".join(str(d) for d in OCR_DPI_STEPS)
+    return (f"adaptativo:{OCR_DPI_LOW}>{steps}:pagina{OCR_MIN_PAGE_CONF}:linha{OCR_MIN_LINE_CONF}"
+            f":fracas{OCR_WEAK_LINES_MAX}:palavras{OCR_MIN_WORDS}")
+
+
+def _ocr_at(page_cache, index, dpi, lang):
+    img = page_cache.get(index, dpi=dpi, mode="gray", normalized=True)
+    page = ocr_image_tsv(img, lang=lang, page_index=index)
+    page.dpi = dpi
+    return page
+
+
+def _weak_lines(page):
+    return [l for l in page.lines if l.words and l.mean_conf < OCR_MIN_LINE_CONF]
+
+
+def page_is_good(page) -> bool:
+    """Confiança suficiente para aceitar a leitura sem subir o DPI da página inteira."""
+    if len(page.words) < OCR_MIN_WORDS or page.mean_conf < OCR_MIN_PAGE_CONF:
+        return False
+    return len(_weak_lines(page)) <= OCR_WEAK_LINES_MAX * len(page.lines)
+
+
+def _reread_lines(page_cache, page, lines, dpi, lang):
+    """
+    Relê só as `lines` fracas num DPI maior, trocando as que melhorarem.
+    Cada linha é renderizada sozinha (clip), sem a página inteira no DPI maior.
+    """
+    if not page.width or not page.height:
+        return 0
+    factor = dpi / float(page.dpi)
+    engine = get_engine()
+    melhoradas = 0
+    for line in lines:
+        x0, y0, x1, y1 = line.box
+        pad = (y1 - y0) * _LINE_PAD
+        clip = (max(0.0, (x0 - pad) / page.width), max(0.0, (y0 - pad) / page.height),
+                min(1.0, (x1 + pad) / page.width), min(1.0, (y1 + pad) / page.height))
+        if clip[2] <= clip[0] or clip[3] <= clip[1]:
+            continue
+        count("ocr_linhas_relidas")
+        crop = page_cache.get(page.index, dpi=dpi, mode="gray", normalized=True, clip=clip)
+        if crop.size == 0:
+            continue
+        # origem do recorte nas coordenadas da página em `dpi`
+        X0, Y0 = clip[0] * page.width * factor, clip[1] * page.height * factor
+        nova = parse_tsv(engine.to_data(crop, lang=lang, config=_LINE_CONFIG),
+                         size=(crop.shape[1], crop.shape[0]))
+        words = nova.words
+        if not words or OcrLine(words).mean_conf <= line.mean_conf:
+            continue
+        # de volta para as coordenadas da página em page.dpi
+        line.words = [OcrWord(w.text, w.conf,
+                              int((w.left + X0) / factor), int((w.top + Y0) / factor),
+                              int(w.width / factor), int(w.height / factor))
+                      for w in words]
+        melhoradas += 1
+    return melhoradas
+
+
+def ocr_page_adaptive(page_cache, index: int, lang: str = "por"):
+    """OcrPage da página `index`, subindo o DPI só onde a confiança pedir."""
+    page = _ocr_at(page_cache, index, OCR_DPI_LOW, lang)
+    if page_is_good(page):
+        count("ocr_dpi_baixo")
+        weak = _weak_lines(page)
+        if weak and OCR_DPI_STEPS:
+            _reread_lines(page_cache, page, weak, OCR_DPI_STEPS[0], lang)
+        return page
+
+    best = page
+    for dpi in OCR_DPI_STEPS:
+        count(f"ocr_dpi_{dpi}")
+        page = _ocr_at(page_cache, index, dpi, lang)
+        if page.mean_conf > best.mean_conf:
+            best = page
+        if page_is_good(page) or not page.words:   # página em branco: não insiste
+            break
+    return best
@@ -0,0 +1,218 @@
+"""
+Interface única de OCR usada por todo o pipeline.
+
+Dois backends, escolhidos por get_engine():
+
+  TesserocrEngine   -> API do Tesseract dentro do processo (tesserocr). Cada
+                       combinação (idioma, psm, variáveis -c) vira um
+                       PyTessBaseAPI carregado UMA vez por worker; sem
+                       subprocesso, sem PNG temporário, sem recarregar o
+                       traineddata a cada chamada. Regiões: SetImage uma vez
+                       e SetRectangle para cada recorte.
+  PytesseractEngine -> fallback (um subprocesso tesseract por chamada).
+
+config.OCR_ENGINE: "auto" (tesserocr se instalado), "tesserocr" ou "pytesseract".
+
+Métodos (mesmos nos dois backends; `config` no formato do pytesseract,
+ex.: "--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789/.-"):
+  to_string(img, lang, config)            -> texto
+  to_data(img, lang, config)              -> dict no formato image_to_data(DICT)
+  regions(img, boxes, lang, config)       -> [texto] para cada (x, y, w, h)
+  osd_rotation(img)                       -> 0/90/180/270 ("Rotate" do OSD) ou None
+
+Uso:
+    engine = get_engine()      # um por worker
+"""
+
+import re
+import shlex
+import importlib.util
+import numpy as np
+import pytesseract
+from pytesseract import Output
+from PIL import Image
+from config import OCR_ENGINE, TESSDATA_PATH
+from instrumentation import count
+
+_HAS_TESSEROCR = importlib.util.find_spec("tesserocr") is not None
+
+_DATA_KEYS = ("level", "page_num", "block_num", "par_num", "line_num", "word_num",
+              "left", "top", "width", "height", "conf", "text")
+
+
+def _parse_config(config):
+    """'--oem 3 --psm 7 -c a=b' -> (psm ou None, {variável: valor})."""
+    psm, variables = None, {}
+    tokens = shlex.split(config or "")
+    i = 0
+    while i < len(tokens):
+        tok = tokens[i]
+        if tok == "--psm" and i + 1 < len(tokens):
+            psm = int(tokens[i + 1])
+            i += 1
+        elif tok == "-c" and i + 1 < len(tokens) and "=" in tokens[i + 1]:
+            k, v = tokens[i + 1].split("=", 1)
+            variables[k] = v
+            i += 1
+        i += 1
+    return psm, variables
+
+
+def _crop(img, box):
+    x, y, w, h = box
+    if isinstance(img, np.ndarray):
+        return img[y:y + h, x:x + w]
+    return img.crop((x, y, x + w, y + h))
+
+
+# ---------------------------------------------------------------
+# Fallback: pytesseract (subprocesso por chamada)
+# ---------------------------------------------------------------
+class PytesseractEngine:
+    nome = "pytesseract"
+
+    def version(self):
+        return str(pytesseract.get_tesseract_version())
+
+    def to_string(self, img, lang="por", config=""):
+        count("tesseract_chamadas")
+        return pytesseract.image_to_string(img, lang=lang, config=config)
+
+    def to_data(self, img, lang="por", config=""):
+        count("tesseract_chamadas")
+        return pytesseract.image_to_data(img, lang=lang, config=config, output_type=Output.DICT)
+
+    def regions(self, img, boxes, lang="por", config=""):
+        return [self.to_string(_crop(img, b), lang, config) for b in boxes]
+
+    def osd_rotation(self, img):
+        count("tesseract_chamadas")
+        osd = pytesseract.image_to_osd(img, config="--psm 0")
+        m = re.search(r"Rotate: (\d+)", osd)
+        return int(m.group(1)) % 360 if m else None
+
+
+# ---------------------------------------------------------------
+# Tesseract no processo: tesserocr
+# ---------------------------------------------------------------
+class TesserocrEngine:
+    nome = "tesserocr"
+
+    def __init__(self, tessdata_path=TESSDATA_PATH):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self.tessdata_path = tessdata_path
+        self._apis = {}   # (lang, psm, variáveis) -> PyTessBaseAPI
+
+    def version(self):
+        # "tesseract 5.3.0\n leptonica-..." -> primeira linha
+        return self._tesserocr.tesseract_version().splitlines()[0].strip()
+
+    def _api(self, lang, config="", psm_default=None):
+        psm, variables = _parse_config(config)
+        psm = psm if psm is not None else psm_default
+        key = (lang or "eng", psm, tuple(sorted(variables.items())))
+        api = self._apis.get(key)
+        if api is None:
+            tr = self._tesserocr
+            kwargs = {"lang": key[0], "variables": variables}
+            if psm is not None:
+                kwargs["psm"] = psm
+            if self.tessdata_path:
+                kwargs["path"] = self.tessdata_path
+            api = tr.PyTessBaseAPI(**kwargs)
+            self._apis[key] = api
+        return api
+
+    @staticmethod
+    def _set_image(api, img):
+        if isinstance(img, np.ndarray):
+            img = Image.fromarray(img)
+        api.SetImage(img)
+
+    def to_string(self, img, lang="por", config=""):
+        count("tesseract_chamadas")
+        api = self._api(lang, config)
+        self._set_image(api, img)
+        return api.GetUTF8Text()
+
+    def regions(self, img, boxes, lang="por", config=""):
+        """Imagem enviada uma vez; cada região só muda o retângulo reconhecido."""
+        if not boxes:
+            return []
+        api = self._api(lang, config)
+        self._set_image(api, img)
+        textos = []
+        for x, y, w, h in boxes:
+            count("tesseract_chamadas")
+            api.SetRectangle(int(x), int(y), int(w), int(h))
+            textos.append(api.GetUTF8Text())
+        return textos
+
+    def to_data(self, img, lang="por", config=""):
+        """Palavras com caixa e confiança, no mesmo dict de pytesseract.image_to_data."""
+        count("tesseract_chamadas")
+        tr = self._tesserocr
+        RIL = tr.RIL
+        api = self._api(lang, config)
+        self._set_image(api, img)
+        api.Recognize()
+
+        data = {k: [] for k in _DATA_KEYS}
+        it = api.GetIterator()
+        if it is None:
+            return data
+        block = par = line = word = 0
+        while True:
+            if it.IsAtBeginningOf(RIL.BLOCK):
+                block, par, line = block + 1, 0, 0
+            if it.IsAtBeginningOf(RIL.PARA):
+                par, line = par + 1, 0
+            if it.IsAtBeginningOf(RIL.TEXTLINE):
+                line, word = line + 1, 0
+            word += 1
+            box = it.BoundingBox(RIL.WORD)
+            text = it.GetUTF8Text(RIL.WORD)
+            if box is not None and text is not None:
+                x1, y1, x2, y2 = box
+                for k, v in (("level", 5), ("page_num", 1), ("block_num", block),
+                             ("par_num", par), ("line_num", line), ("word_num", word),
+                             ("left", x1), ("top", y1), ("width", x2 - x1),
+                             ("height", y2 - y1), ("conf", it.Confidence(RIL.WORD)),
+                             ("text", text)):
+                    data[k].append(v)
+            if not it.Next(RIL.WORD):
+                break
+        return data
+
+    def osd_rotation(self, img):
+        count("tesseract_chamadas")
+        api = self._api("osd", psm_default=self._tesserocr.PSM.OSD_ONLY)   # osd.traineddata
+        self._set_image(api, img)
+        osd = api.DetectOrientationScript()
+        if not osd:
+            return None
+        # orient_deg = rotação detectada; "Rotate" = quanto girar para endireitar
+        return (360 - int(osd["orient_deg"])) % 360
+
+    def close(self):
+        for api in self._apis.values():
+            api.End()
+        self._apis.clear()
+
+
+def _build_engine():
+    if OCR_ENGINE in ("auto", "tesserocr") and _HAS_TESSEROCR:
+        try:
+            return TesserocrEngine()
+        except Exception as e:
+            print(f"⚠️ tesserocr indisponível ({e}); usando pytesseract.")
+    elif OCR_ENGINE == "tesserocr":
+        print("⚠️ tesserocr não instalado; usando pytesseract.")
+    return PytesseractEngine()
+
+
+def get_engine():
+    """Motor de OCR do processo (criado uma vez por worker, no registro de modelos)."""
+    from nlp_loader import get_model
+    return get_model("ocr_engine", _build_engine)
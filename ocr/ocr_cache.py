@@ -0,0 +1,256 @@
+"""
+Resultados de OCR guardados em disco, endereçados pelo conteúdo.
+
+A chave junta o hash do PDF (+ página) ou da imagem com tudo o que muda o
+resultado do Tesseract: idioma, DPI, config (psm/whitelist), etapa de
+pré-processamento e motor/versão do Tesseract. O mesmo scan recebido de novo (outra
+filial, outra pasta, reprocessamento após mudar as regras de extract_tipo/
+extract_motivo) sai do cache sem renderizar nem rodar OCR.
+
+Formato: <OCR_CACHE_DIR>/<2 primeiros hex>/<chave>.json com
+    {"text": "...", "page": OcrPage serializado ou null}
+
+Eviction LRU por tamanho: cada acerto atualiza o mtime do arquivo; quando o
+total passa de OCR_CACHE_MAX_MB, os arquivos mais antigos são apagados até
+sobrar 90% do orçamento. Gravação atômica (vários workers escrevem juntos).
+
+Uso:
+    cache = get_ocr_cache()            # None se desligado em config
+    key = cache.key(pages.digest, pagina=0, lang="por", dpi=300, etapa="tsv")
+    hit = cache.get(key)
+    if hit is None:
+        cache.put(key, {"text": texto, "page": None})
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+from config import OCR_CACHE_ENABLED, OCR_CACHE_DIR, OCR_CACHE_MAX_MB
+from instrumentation import count
+from .engine import get_engine
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 do conteúdo do arquivo."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def image_digest(img):
+    """Hash de um array numpy (pixels + formato), para crops e páginas em memória."""
+    arr = np.ascontiguousarray(img)
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{arr.shape}|{arr.dtype}".encode("ascii"))
+    h.update(memoryview(arr).cast("B"))
+    return h.hexdigest()
+
+
+_ENGINE = None
+
+
+def _engine_version():
+    """Motor + versão do Tesseract (parte da chave: trocar/atualizar o motor invalida o cache)."""
+    global _ENGINE
+    if _ENGINE is None:
+        try:
+            engine = get_engine()
+            _ENGINE = f"{engine.nome}-{engine.version()}"
+        except Exception:
+            _ENGINE = "desconhecida"
+    return _ENGINE
+
+
+class OcrCache:
+    def __init__(self, cache_dir: str = OCR_CACHE_DIR, max_bytes: int = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = None   # estimativa do tamanho em disco (lida na 1ª gravação)
+
+    # -----------------------------------------------------------
+    # Chaves
+    # -----------------------------------------------------------
+    def key(self, digest: str, **settings) -> str:
+        parts = [digest, f"tesseract={_engine_version()}"]
+        parts += [f"{k}={settings[k]}" for k in sorted(settings)]
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    # -----------------------------------------------------------
+    # Leitura / gravação
+    # -----------------------------------------------------------
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            count("cache_ocr_falhas")
+            return None
+        try:
+            os.utime(path)   # marca como usado recentemente (LRU)
+        except OSError:
+            pass
+        self.hits += 1
+        count("cache_ocr_acertos")
+        return value
+
+    def put(self, key: str, value: dict):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            size = os.path.getsize(tmp)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"⚠️ Não foi possível gravar no cache de OCR: {e}")
+            return
+        if self.max_bytes:
+            if self._bytes is None:
+                self._bytes = self._disk_usage()
+            else:
+                self._bytes += size
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    # -----------------------------------------------------------
+    # Eviction
+    # -----------------------------------------------------------
+    def _entries(self):
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".json"):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    yield entry.path, st.st_size, st.st_mtime
+
+    def _disk_usage(self) -> int:
+        try:
+            return sum(size for _, size, _ in self._entries())
+        except OSError:
+            return 0
+
+    def _evict(self):
+        """Apaga os resultados usados há mais tempo até ficar em 90% do orçamento."""
+        try:
+            entries = sorted(self._entries(), key=lambda e: e[2])
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._bytes = total
+
+
+_CACHE = None
+_ENABLED = OCR_CACHE_ENABLED
+
+
+def set_ocr_cache_enabled(enabled: bool):
+    """Liga/desliga o cache neste processo (ex.: benchmark medindo o OCR a frio)."""
+    global _ENABLED
+    _ENABLED = enabled
+
+
+def get_ocr_cache():
+    """Cache do processo (um por worker), ou None se estiver desligado."""
+    global _CACHE
+    if not _ENABLED:
+        return None
+    if _CACHE is None:
+        _CACHE = OcrCache(OCR_CACHE_DIR, max_bytes=OCR_CACHE_MAX_MB * 1024 * 1024)
+    return _CACHE
+
+
+def cached_page_text(page_cache, index: int, etapa: str, ocr_fn, dpi: int = 300,
+                     lang: str = "por", normalized: bool = False, mode: str = "rgb") -> str:
+    """
+    Texto da página `index` do PDF do `page_cache` por `ocr_fn(img)`, com
+    cache pelo hash do PDF. Em acerto a página nem é renderizada.
+    `normalized`: ocr_fn recebe a página já em pé e reta (page_geometry).
+    `mode`: "rgb", "bgr" ou "gray" (cinza sai direto do renderizador).
+    """
+    cache = get_ocr_cache()
+    key = None
+    if cache is not None:
+        key = cache.key(page_cache.digest, pagina=index, dpi=dpi, lang=lang, etapa=etapa,
+                        normalizada=normalized, modo=mode)
+        hit = cache.get(key)
+        if hit is not None:
+            return hit["text"]
+
+    text = ocr_fn(page_cache.get(index, dpi=dpi, mode=mode, normalized=normalized))
+    if cache is not None:
+        cache.put(key, {"text": text, "page": None})
+    return text
+
+
+def cached_image_to_string(img, lang: str = "por", config: str = "", etapa: str = "imagem",
+                           preprocess=None) -> str:
+    """
+    OCR de uma imagem (ocr.engine) com cache pelo hash da imagem ORIGINAL
+    (antes de `preprocess`, que também é pulado quando há acerto).
+    """
+    cache = get_ocr_cache()
+    key = None
+    if cache is not None:
+        key = cache.key(image_digest(img), lang=lang, config=config, etapa=etapa)
+        hit = cache.get(key)
+        if hit is not None:
+            return hit["text"]
+
+    text = get_engine().to_string(preprocess(img) if preprocess else img,
+                                  lang=lang, config=config)
+    if cache is not None:
+        cache.put(key, {"text": text, "page": None})
+    return text
+
+
+def cached_regions(img, boxes, lang: str = "por", config: str = "", etapa: str = "regioes",
+                   preprocess=None) -> list:
+    """
+    OCR de várias regiões (x, y, w, h) da mesma imagem: a imagem é
+    pré-processada e enviada ao motor uma vez só (SetImage + SetRectangle no
+    tesserocr). Cache por região, pelo hash da imagem original.
+    """
+    cache = get_ocr_cache()
+    boxes = [tuple(int(v) for v in b) for b in boxes]
+    textos, keys = [None] * len(boxes), [None] * len(boxes)
+    if cache is not None and boxes:
+        digest = image_digest(img)
+        for j, box in enumerate(boxes):
+            keys[j] = cache.key(digest, regiao=box, lang=lang, config=config, etapa=etapa)
+            hit = cache.get(keys[j])
+            if hit is not None:
+                textos[j] = hit["text"]
+
+    faltam = [j for j, t in enumerate(textos) if t is None]
+    if faltam:
+        base = preprocess(img) if preprocess else img
+        novos = get_engine().regions(base, [boxes[j] for j in faltam], lang=lang, config=config)
+        for j, text in zip(faltam, novos):
+            textos[j] = text
+            if cache is not None:
+                cache.put(keys[j], {"text": text, "page": None})
+    return textos
@@ -3,20 +3,26 @@
 # Pipeline completo de OCR robusto + deskew + limpeza profunda
 # ============================================================
 
+import os
 import cv2
 import numpy as np
-from pdf2image import convert_from_path
 from PIL import Image
 import pytesseract
 import re
 import unicodedata
+from .page_cache import PageCache
+from .ocr_cache import cached_page_text
+from .preprocess import estimate_skew, rotate, timed
+from .engine import get_engine
 
 # ------------------------------------------------------------
 # CONFIG
 # ------------------------------------------------------------
 POPPLER_PATH = r"C:\Program Files\poppler-24.02.0\Library\bin"
 TESSERACT_EXE = r"C:\Users\pedro.a\AppData\Local\Programs\Tesseract-OCR\tesseract.exe"
-pytesseract.pytesseract.tesseract_cmd = TESSERACT_EXE
+# só sobrescreve o caminho do Tesseract se o executável existir nesta máquina
+if os.path.exists(TESSERACT_EXE):
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_EXE
 
 
 # ------------------------------------------------------------
@@ -31,26 +37,12 @@ def normalize_unicode(text: str) -> str:
 # DESKEW – corrigir inclinação automaticamente
 # ------------------------------------------------------------
 def deskew_cv(image: np.ndarray) -> np.ndarray:
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    gray = cv2.bitwise_not(gray)
-
-    thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
-
-    coords = np.column_stack(np.where(thresh > 0))
-    angle = cv2.minAreaRect(coords)[-1]
-
-    if angle < -45:
-        angle = -(90 + angle)
-    else:
-        angle = -angle
-
-    (h, w) = image.shape[:2]
-    M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
-
-    rotated = cv2.warpAffine(image, M, (w, h),
-                             flags=cv2.INTER_CUBIC,
-                             borderMode=cv2.BORDER_REPLICATE)
-    return rotated
+    # ângulo estimado numa cópia reduzida e binarizada (perfil de projeção);
+    # só a rotação final roda na resolução cheia
+    with timed("preproc_inclinacao"):
+        angle = estimate_skew(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+    with timed("preproc_rotacao"):
+        return rotate(image, angle)
 
 
 # ------------------------------------------------------------
@@ -85,19 +77,22 @@ def clean_ocr_text(text: str) -> str:
 # ------------------------------------------------------------
 # OCR PRINCIPAL — PDF → texto limpo
 # ------------------------------------------------------------
-def ocr_pdf_clean(pdf_path: str) -> str:
-    pages = convert_from_path(pdf_path, dpi=300, poppler_path=POPPLER_PATH)
+def ocr_pdf_clean(pdf_path: str, page_cache: PageCache = None) -> str:
+    """
+    Se `page_cache` for passado, reaproveita as páginas já renderizadas
+    pelo pipeline em vez de chamar o poppler novamente.
+    """
+    if page_cache is None:
+        page_cache = PageCache(pdf_path, poppler_path=POPPLER_PATH)
 
     final_text = []
 
-    for pil_img in pages:
-        img = np.array(pil_img)
-
-        # deskew
-        img = deskew_cv(img)
-
-        # OCR
-        raw_text = pytesseract.image_to_string(img, lang="por")
+    for i in range(page_cache.num_pages):
+        # página já em pé e reta (geometria do PageCache, sem deskew próprio) + OCR
+        # (texto bruto em cache pelo hash do PDF; página só é renderizada se faltar)
+        raw_text = cached_page_text(
+            page_cache, i, etapa="ocr_cleaner", normalized=True, mode="gray",
+            ocr_fn=lambda img: get_engine().to_string(img, lang="por"))
 
         # limpar
         cleaned = clean_ocr_text(raw_text)
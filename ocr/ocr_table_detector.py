@@ -19,6 +19,10 @@ Funções principais:
   correct_rotation(img)       -> deskew
   detect_name_block(img)      -> crop focado no bloco do nome
   process_for_ocr(path)       -> pipeline completa
+  process_for_ocr_array(img, angle) -> pipeline completa a partir de um array em memória
+  process_for_ocr_boxes(img, angle) -> idem, devolvendo caixas (x, y, w, h) em vez de
+                                       recortes (OCR de regiões com SetRectangle)
+  scale_box(box, factor, shape)     -> caixa detectada em DPI baixo -> DPI do OCR
 
 IMPORTANTE:
   Este módulo NÃO faz OCR — ele prepara a imagem para o OCR externo.
@@ -33,6 +37,19 @@ def _to_gray(img):
     return img
 
 
+def _crop(img, box):
+    x, y, w, h = box
+    return img[y:y + h, x:x + w]
+
+
+def scale_box(box, factor: float, shape) -> Tuple[int, int, int, int]:
+    """Caixa achada numa renderização menor -> coordenadas de outra `factor` vezes maior."""
+    H, W = shape[:2]
+    x, y, w, h = (int(round(v * factor)) for v in box)
+    x, y = min(max(0, x), W), min(max(0, y), H)
+    return x, y, min(w, W - x), min(h, H - y)
+
+
 def correct_rotation(img: np.ndarray) -> np.ndarray:
     """
     Deskew baseado em projeção + Hough.
@@ -74,13 +91,18 @@ def detect_table_region(img: np.ndarray) -> np.ndarray:
       - detectar contornos grandes
       - pegar o maior retângulo interno
     """
+    return _crop(img, table_box(img))
+
+
+def table_box(img: np.ndarray) -> Tuple[int, int, int, int]:
+    """Caixa (x, y, w, h) da tabela principal; a página inteira se nada for achado."""
     gray = _to_gray(img)
     thr = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
                                  cv2.THRESH_BINARY_INV, 31, 10)
 
     contours, _ = cv2.findContours(thr, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     if not contours:
-        return img
+        return 0, 0, img.shape[1], img.shape[0]
 
     # Ordena contornos por área
     contours = sorted(contours, key=cv2.contourArea, reverse=True)
@@ -94,7 +116,7 @@ def detect_table_region(img: np.ndarray) -> np.ndarray:
     w2 = min(img.shape[1] - x2, w + 2 * pad)
     h2 = min(img.shape[0] - y2, h + 2 * pad)
 
-    return img[y2:y2 + h2, x2:x2 + w2]
+    return x2, y2, w2, h2
 
 
 # ---------------------------------------------------------------
@@ -110,8 +132,14 @@ def detect_name_block(img: np.ndarray) -> Optional[np.ndarray]:
       - procurar por área de maior densidade de caracteres
       - retornar região mais provável
     """
+    return _crop(img, name_box(img))
+
+
+def name_box(img: np.ndarray) -> Tuple[int, int, int, int]:
+    """Caixa (x, y, w, h) do bloco do nome, nas coordenadas de `img`."""
     h, w = img.shape[:2]
     top_region = img[0:int(h * 0.28), :]
+    top_box = (0, 0, w, top_region.shape[0])
     gray = _to_gray(top_region)
 
     thr = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
@@ -119,7 +147,7 @@ def detect_name_block(img: np.ndarray) -> Optional[np.ndarray]:
 
     contours, _ = cv2.findContours(thr, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     if not contours:
-        return top_region
+        return top_box
 
     # pegar contorno mais largo (texto geralmente fica em linha ampla)
     best = None
@@ -131,7 +159,7 @@ def detect_name_block(img: np.ndarray) -> Optional[np.ndarray]:
             best_w = cw
 
     if best is None:
-        return top_region
+        return top_box
 
     x, y, cw, ch = best
 
@@ -142,7 +170,7 @@ def detect_name_block(img: np.ndarray) -> Optional[np.ndarray]:
     cw2 = min(w - x2, cw + pad * 2)
     ch2 = min(top_region.shape[0] - y2, ch + pad * 2)
 
-    return top_region[y2:y2 + ch2, x2:x2 + cw2]
+    return x2, y2, cw2, ch2
 
 
 # ---------------------------------------------------------------
@@ -158,10 +186,40 @@ def process_for_ocr(path: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     if img is None:
         raise FileNotFoundError(f"Não foi possível carregar: {path}")
 
-    rotated = correct_rotation(img)
-    table = detect_table_region(rotated)
-    name = detect_name_block(table)
-    return rotated, table, name
+    return process_for_ocr_array(img)
+
+
+def process_for_ocr_array(img: np.ndarray, angle: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Mesma pipeline de process_for_ocr, mas recebe a página já decodificada
+    (BGR ou cinza), sem passar pelo disco. O array de entrada não é alterado.
+    `angle`: inclinação já conhecida (page_geometry). Com 0.0 — página já
+    normalizada pelo PageCache — o Canny+Hough de correct_rotation é pulado.
+    """
+    rotated, tbox, nbox = process_for_ocr_boxes(img, angle)
+    return rotated, _crop(rotated, tbox), _crop(rotated, nbox)
+
+
+def process_for_ocr_boxes(img: np.ndarray, angle: Optional[float] = None):
+    """
+    Igual a process_for_ocr_array, mas devolve (rotated, caixa_tabela, caixa_nome),
+    com as caixas (x, y, w, h) nas coordenadas de `rotated` — para OCR de
+    várias regiões com uma única imagem no motor (SetImage + SetRectangle).
+    """
+    if img is None or img.size == 0:
+        raise ValueError("Imagem vazia para process_for_ocr_array")
+
+    if angle is None:
+        rotated = correct_rotation(img)
+    elif abs(angle) < 0.05:
+        rotated = img
+    else:
+        (h, w) = img.shape[:2]
+        M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+        rotated = cv2.warpAffine(img, M, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+    tx, ty, tw, th = table_box(rotated)
+    nx, ny, nw, nh = name_box(_crop(rotated, (tx, ty, tw, th)))
+    return rotated, (tx, ty, tw, th), (tx + nx, ty + ny, nw, nh)
 
 
 # ---------------------------------------------------------------
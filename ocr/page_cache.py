@@ -0,0 +1,187 @@
+"""
+Páginas rasterizadas de um documento, guardadas enquanto ele é processado.
+
+Cada página do PDF é renderizada no máximo UMA vez por DPI/modo, de forma
+preguiçosa (só quando algum estágio pede aquela página), pela fonte de
+páginas de ocr/page_source.py (PyMuPDF direto para numpy; pdf2image como
+fallback). Cada estágio pede a resolução de que precisa:
+
+  RENDER_DPI_GEOMETRY -> cinza reduzido para a geometria (OSD + inclinação)
+  RENDER_DPI_DETECT   -> cinza para o detector de tabela/bloco do nome
+  RENDER_DPI_OCR      -> páginas e regiões que vão para o Tesseract
+
+Todos os estágios que pedem a mesma (página, DPI, modo) recebem o mesmo
+buffer numpy já decodificado.
+
+Uso:
+    pages = PageCache(path, poppler_path=POPPLER_PATH)
+    primeira = pages.get(0)                 # RGB, 300 DPI
+    cinza = pages.get(0, mode="gray")       # cinza renderizado direto (1 canal)
+    thumb = pages.get(0, dpi=100, mode="gray")
+    topo = pages.get(0, mode="gray", clip=(0, 0, 1, 0.3))   # só o terço de cima
+    reta = pages.get(0, normalized=True)    # em pé e sem inclinação (geometria em cache)
+    pages.geometry(0).orientation           # "horizontal" / "vertical"
+    for img in pages.iter_pages(mode="bgr"):
+        ...
+    pages.clear()
+
+IMPORTANTE:
+  Os arrays devolvidos são compartilhados — quem precisar alterar a imagem
+  deve fazer uma cópia antes.
+  Com `max_bytes`, as páginas usadas há mais tempo saem do cache quando o
+  total passa do orçamento (e serão renderizadas de novo se pedidas).
+  `clip` = (x0, y0, x1, y1) em frações da página. Com normalized=True o
+  recorte é feito na página já endireitada.
+"""
+
+from collections import OrderedDict
+import numpy as np
+import cv2
+from PIL import Image
+from config import RENDER_DPI_OCR, RENDER_DPI_GEOMETRY
+from .ocr_cache import file_digest
+from .page_geometry import estimate_geometry, apply_geometry, PageGeometry, source_clip, normalize_clip
+from .page_source import open_page_source, Pdf2ImagePageSource, clip_pixels
+
+DEFAULT_DPI = RENDER_DPI_OCR
+
+
+class PageCache:
+    def __init__(self, pdf_path: str, poppler_path: str = None, max_bytes: int = None):
+        self.pdf_path = pdf_path
+        self.poppler_path = poppler_path or None
+        self.max_bytes = max_bytes
+        self._source = None
+        self._digest = None
+        self._geometry = {}   # indice -> PageGeometry (calculada uma vez por página)
+        # (indice, dpi, modo, normalizada, clip) -> np.ndarray, em ordem de uso (LRU)
+        self._pages = OrderedDict()
+        self._bytes = 0
+        self.renders = 0
+
+    # -----------------------------------------------------------
+    # Informações do documento
+    # -----------------------------------------------------------
+    @property
+    def source(self):
+        """Fonte de páginas (aberta na primeira vez que alguém precisa dela)."""
+        if self._source is None:
+            self._source = open_page_source(self.pdf_path, self.poppler_path)
+        return self._source
+
+    @property
+    def num_pages(self) -> int:
+        try:
+            return self.source.num_pages
+        except Exception:
+            return 0
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 do conteúdo do PDF (chave do cache de OCR), calculado uma vez."""
+        if self._digest is None:
+            self._digest = file_digest(self.pdf_path)
+        return self._digest
+
+    # -----------------------------------------------------------
+    # Renderização
+    # -----------------------------------------------------------
+    def _render(self, index: int, dpi: int, mode: str, clip) -> np.ndarray:
+        """Renderiza somente a página (ou o recorte) pedida."""
+        try:
+            img = self.source.render(index, dpi, mode, clip)
+        except IndexError:
+            raise
+        except Exception as e:
+            if isinstance(self._source, Pdf2ImagePageSource):
+                raise
+            # página que o PyMuPDF não consegue rasterizar: poppler para o resto do documento
+            print(f"⚠️ PyMuPDF falhou na página {index + 1} ({e}); usando pdf2image.")
+            self._source.close()
+            self._source = Pdf2ImagePageSource(self.pdf_path, self.poppler_path)
+            img = self._source.render(index, dpi, mode, clip)
+        self.renders += 1
+        return img
+
+    def geometry(self, index: int, dpi: int = RENDER_DPI_GEOMETRY) -> PageGeometry:
+        """Rotação grossa + inclinação da página (ocr/page_geometry.py), em cache."""
+        geom = self._geometry.get(index)
+        if geom is None:
+            geom = estimate_geometry(self.get(index, dpi, "gray"))
+            self._geometry[index] = geom
+        return geom
+
+    def get(self, index: int, dpi: int = DEFAULT_DPI, mode: str = "rgb",
+            normalized: bool = False, clip=None) -> np.ndarray:
+        """
+        Retorna a página `index` (0-based) como array numpy.
+        mode: "rgb" (padrão), "bgr" (para cv2) ou "gray".
+        normalized: aplica a geometria da página (em pé + deskew).
+        clip: (x0, y0, x1, y1) em frações da página; só esse retângulo.
+        """
+        clip = tuple(clip) if clip is not None else None
+        key = (index, dpi, mode, normalized, clip)
+        img = self._pages.get(key)
+        if img is not None:
+            self._pages.move_to_end(key)
+            return img
+
+        if normalized:
+            geom = self.geometry(index)
+            if geom.identity:
+                return self.get(index, dpi, mode, clip=clip)   # página já reta: mesmo buffer
+            full = (index, dpi, mode, True, None)
+            src = source_clip(geom, clip) if clip is not None and full not in self._pages else None
+            if src is not None:
+                # só o retângulo da página original que contém o recorte é renderizado
+                img = normalize_clip(self.get(index, dpi, mode, clip=src), geom, src, clip)
+            elif clip is not None:
+                page = self.get(index, dpi, mode, normalized=True)
+                img = page[clip_pixels(page.shape, clip)]
+            else:
+                img = apply_geometry(self.get(index, dpi, mode), geom)
+        elif mode == "bgr":
+            img = cv2.cvtColor(self.get(index, dpi, "rgb", clip=clip), cv2.COLOR_RGB2BGR)
+        elif clip is not None and ((index, dpi, mode, False, None) in self._pages
+                                   or isinstance(self.source, Pdf2ImagePageSource)):
+            # página inteira já em memória, ou poppler (que não recorta): corta dela
+            page = self.get(index, dpi, mode)
+            img = page[clip_pixels(page.shape, clip)]
+        elif mode == "gray" and (index, dpi, "rgb", False, clip) in self._pages:
+            img = cv2.cvtColor(self._pages[(index, dpi, "rgb", False, clip)], cv2.COLOR_RGB2GRAY)
+        elif mode in ("rgb", "gray"):
+            img = self._render(index, dpi, mode, clip)
+        else:
+            raise ValueError(f"Modo de cor desconhecido: {mode}")
+
+        self._pages[key] = img
+        self._bytes += img.nbytes
+        self._evict(keep=key)
+        return img
+
+    def _evict(self, keep):
+        """Remove as páginas menos usadas até caber no orçamento (nunca a recém-pedida)."""
+        if not self.max_bytes:
+            return
+        while self._bytes > self.max_bytes and len(self._pages) > 1:
+            old_key = next(iter(self._pages))
+            if old_key == keep:
+                self._pages.move_to_end(old_key)
+                continue
+            self._bytes -= self._pages.pop(old_key).nbytes
+
+    def get_pil(self, index: int, dpi: int = DEFAULT_DPI) -> Image.Image:
+        """Visão PIL da página (sem copiar o buffer)."""
+        return Image.fromarray(self.get(index, dpi))
+
+    def iter_pages(self, dpi: int = DEFAULT_DPI, mode: str = "rgb"):
+        for i in range(self.num_pages):
+            yield self.get(i, dpi, mode)
+
+    def clear(self):
+        self._pages.clear()
+        self._geometry.clear()
+        self._bytes = 0
+        if self._source is not None:
+            self._source.close()
+            self._source = None
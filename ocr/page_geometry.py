@@ -0,0 +1,150 @@
+"""
+Rotação e inclinação de uma página, medidas uma vez só.
+
+A medição é feita numa cópia reduzida (lado maior <= PAGE_GEOMETRY_MAX_SIDE):
+
+  rotation -> rotação grossa 0/90/180/270 (OSD do Tesseract; sem OSD, o perfil
+              de projeção decide só entre 0 e 90)
+  skew     -> inclinação fina em graus (ocr.preprocess.estimate_skew), medida
+              já com a rotação grossa aplicada
+
+O PageCache guarda a geometria por página e entrega a imagem normalizada
+(pages.get(i, normalized=True)) para o OCR, o detector de tabela e o OCR de
+datas; a orientação usada pelo extract_tipo sai da mesma geometria, sem um
+image_to_osd separado na página inteira.
+
+Uso:
+    geom = estimate_geometry(img)
+    reta = apply_geometry(img, geom)
+    geom.orientation   # "horizontal" / "vertical"
+"""
+
+import math
+from dataclasses import dataclass
+import numpy as np
+import cv2
+from config import PAGE_GEOMETRY_OSD, PAGE_GEOMETRY_MAX_SIDE
+from .engine import get_engine
+from .preprocess import estimate_skew, rotate, to_gray, timed, downscale
+
+# "Rotate: N" do OSD = graus no sentido horário para deixar a página em pé
+_CV_ROTATE = {
+    90: cv2.ROTATE_90_CLOCKWISE,
+    180: cv2.ROTATE_180,
+    270: cv2.ROTATE_90_COUNTERCLOCKWISE,
+}
+
+
+@dataclass(frozen=True)
+class PageGeometry:
+    rotation: int = 0
+    skew: float = 0.0
+    width: int = 0     # tamanho da imagem ORIGINAL (antes da rotação)
+    height: int = 0
+
+    @property
+    def identity(self) -> bool:
+        return self.rotation == 0 and abs(self.skew) < 0.05
+
+    @property
+    def orientation(self) -> str:
+        """Página em pé mais larga que alta = "horizontal" (mesmo critério de detect_orientation_pdf)."""
+        w, h = (self.height, self.width) if self.rotation in (90, 270) else (self.width, self.height)
+        return "horizontal" if w > h else "vertical"
+
+
+def detect_rotation(small_gray) -> int:
+    """Rotação grossa (0/90/180/270) de uma página já reduzida."""
+    if PAGE_GEOMETRY_OSD:
+        try:
+            rotation = get_engine().osd_rotation(small_gray)
+            if rotation is not None:
+                return rotation
+        except Exception:
+            pass
+
+    # sem OSD: linhas de texto horizontais dão perfil de linhas mais "picado" que o de colunas
+    binary = cv2.threshold(small_gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)[1]
+    rows = cv2.reduce(binary, 1, cv2.REDUCE_SUM, dtype=cv2.CV_32F).ravel()
+    cols = cv2.reduce(binary, 0, cv2.REDUCE_SUM, dtype=cv2.CV_32F).ravel()
+    return 0 if np.var(rows) >= np.var(cols) else 90
+
+
+def apply_rotation(img, rotation):
+    code = _CV_ROTATE.get(rotation)
+    return cv2.rotate(img, code) if code is not None else img
+
+
+def estimate_geometry(img, max_side=PAGE_GEOMETRY_MAX_SIDE) -> PageGeometry:
+    """Rotação grossa + inclinação fina de uma página (RGB/BGR/cinza)."""
+    gray = to_gray(img)
+    h, w = gray.shape[:2]
+    small = downscale(gray, max_side)
+    with timed("geometria_rotacao"):
+        rotation = detect_rotation(small)
+    with timed("geometria_inclinacao"):
+        skew = estimate_skew(apply_rotation(small, rotation), max_side=max_side)
+    return PageGeometry(rotation=rotation, skew=skew, width=w, height=h)
+
+
+def apply_geometry(img, geom: PageGeometry):
+    """Deixa a página em pé e reta (rotação exata de 90° + deskew fino)."""
+    if geom.identity:
+        return img
+    with timed("geometria_aplicar"):
+        return rotate(apply_rotation(img, geom.rotation), geom.skew)
+
+
+def _unrotate(u, v, rotation, w, h):
+    """Ponto da página já girada (cv2.rotate) -> ponto na página original w x h."""
+    if rotation == 90:
+        return v, h - u
+    if rotation == 180:
+        return w - u, h - v
+    if rotation == 270:
+        return w - v, u
+    return u, v
+
+
+def source_clip(geom: PageGeometry, clip):
+    """
+    Recorte `clip` (frações da página normalizada) -> menor retângulo da página
+    ORIGINAL que o contém, em frações, para renderizar só ele. None se esse
+    retângulo sair da página (aí só recortando a página normalizada inteira).
+    """
+    w, h = geom.width, geom.height
+    if not w or not h:
+        return None
+    wn, hn = (h, w) if geom.rotation in (90, 270) else (w, h)
+    cx, cy = wn / 2, hn / 2
+    a, b = math.cos(math.radians(geom.skew)), math.sin(math.radians(geom.skew))
+    x0, y0, x1, y1 = clip
+    xs, ys = [], []
+    for fx, fy in ((x0, y0), (x1, y0), (x0, y1), (x1, y1)):
+        # desfaz o deskew (inversa de cv2.getRotationMatrix2D em torno do centro)
+        dx, dy = fx * wn - cx, fy * hn - cy
+        x, y = _unrotate(a * dx - b * dy + cx, b * dx + a * dy + cy, geom.rotation, w, h)
+        xs.append(x / w)
+        ys.append(y / h)
+    src = (min(xs), min(ys), max(xs), max(ys))
+    if src[0] < 0 or src[1] < 0 or src[2] > 1 or src[3] > 1 or src[2] <= src[0] or src[3] <= src[1]:
+        return None
+    return src
+
+
+def normalize_clip(raw, geom: PageGeometry, src, clip):
+    """
+    Recorte `raw` da página original (retângulo `src` de source_clip) -> o
+    mesmo pedaço que `clip` daria na página normalizada. O centro de `src` é o
+    centro de `clip`, então basta aplicar a geometria e cortar o meio.
+    """
+    hr, wr = raw.shape[:2]
+    page_w, page_h = wr / (src[2] - src[0]), hr / (src[3] - src[1])
+    if geom.rotation in (90, 270):
+        page_w, page_h = page_h, page_w
+    out_w = max(1, int(round((clip[2] - clip[0]) * page_w)))
+    out_h = max(1, int(round((clip[3] - clip[1]) * page_h)))
+    img = apply_geometry(raw, geom)
+    h, w = img.shape[:2]
+    top, left = max(0, (h - out_h) // 2), max(0, (w - out_w) // 2)
+    return img[top:top + out_h, left:left + out_w]
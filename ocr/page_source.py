@@ -0,0 +1,135 @@
+"""
+Renderiza páginas de PDF, uma por chamada, direto para arrays numpy.
+
+Cada estágio escolhe a resolução e o espaço de cor de que precisa:
+
+  FitzPageSource     -> PyMuPDF dentro do processo: sem pdftoppm, sem PPM em
+                        disco; cinza renderizado já em 1 canal; `clip` só
+                        rasteriza o retângulo pedido.
+  Pdf2ImagePageSource-> fallback (poppler/pdf2image), mesma interface; cinza e
+                        clip derivados da página RGB inteira.
+
+config.PAGE_RENDERER: "fitz" (padrão) ou "pdf2image". Se o PyMuPDF não abrir o
+PDF (arquivo danificado), open_page_source cai para o pdf2image.
+
+Uso:
+    src = open_page_source(path, poppler_path=POPPLER_PATH)
+    thumb = src.render(0, dpi=100, mode="gray")
+    topo = src.render(0, dpi=300, mode="gray", clip=(0, 0, 1, 0.3))
+    src.close()
+
+`clip` = (x0, y0, x1, y1) em frações da página (0..1), já considerando o
+/Rotate do PDF — o mesmo retângulo vale para qualquer DPI.
+"""
+
+import numpy as np
+import cv2
+import fitz           # PyMuPDF
+import pypdf
+from pdf2image import convert_from_path
+from config import PAGE_RENDERER
+from instrumentation import count
+
+_MODES = ("rgb", "bgr", "gray")
+
+
+def _check_mode(mode):
+    if mode not in _MODES:
+        raise ValueError(f"Modo de cor desconhecido: {mode}")
+
+
+def clip_pixels(shape, clip):
+    """Fração (x0, y0, x1, y1) -> fatia de pixels de uma imagem `shape`."""
+    h, w = shape[:2]
+    x0, y0, x1, y1 = clip
+    return slice(int(round(y0 * h)), int(round(y1 * h))), slice(int(round(x0 * w)), int(round(x1 * w)))
+
+
+class FitzPageSource:
+    nome = "fitz"
+
+    def __init__(self, pdf_path: str):
+        self.pdf_path = pdf_path
+        self._doc = fitz.open(pdf_path)
+
+    @property
+    def num_pages(self) -> int:
+        return self._doc.page_count
+
+    def render(self, index: int, dpi: int, mode: str = "rgb", clip=None) -> np.ndarray:
+        _check_mode(mode)
+        if not 0 <= index < self._doc.page_count:
+            raise IndexError(f"Página {index} não encontrada em {self.pdf_path}")
+        page = self._doc[index]
+        rect = None
+        if clip is not None:
+            r = page.rect
+            x0, y0, x1, y1 = clip
+            rect = fitz.Rect(r.x0 + x0 * r.width, r.y0 + y0 * r.height,
+                             r.x0 + x1 * r.width, r.y0 + y1 * r.height)
+        cs = fitz.csGRAY if mode == "gray" else fitz.csRGB
+        pix = page.get_pixmap(dpi=dpi, colorspace=cs, clip=rect, alpha=False)
+        count("paginas_renderizadas")
+
+        # samples é uma cópia (bytes) — o array não depende do pixmap
+        buf = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+        img = buf[:, :pix.width * pix.n].reshape(pix.height, pix.width, pix.n)
+        if pix.n == 1:
+            img = img[:, :, 0]
+        if mode == "bgr":
+            img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+        return np.ascontiguousarray(img)
+
+    def close(self):
+        self._doc.close()
+
+
+class Pdf2ImagePageSource:
+    nome = "pdf2image"
+
+    def __init__(self, pdf_path: str, poppler_path: str = None):
+        self.pdf_path = pdf_path
+        self.poppler_path = poppler_path or None
+        self._num_pages = None
+
+    @property
+    def num_pages(self) -> int:
+        if self._num_pages is None:
+            try:
+                self._num_pages = len(pypdf.PdfReader(self.pdf_path).pages)
+            except Exception:
+                self._num_pages = 0
+        return self._num_pages
+
+    def render(self, index: int, dpi: int, mode: str = "rgb", clip=None) -> np.ndarray:
+        """Renderiza somente a página pedida (1 chamada ao poppler por página)."""
+        _check_mode(mode)
+        pil_pages = convert_from_path(
+            self.pdf_path,
+            dpi=dpi,
+            first_page=index + 1,
+            last_page=index + 1,
+            poppler_path=self.poppler_path,
+        )
+        if not pil_pages:
+            raise IndexError(f"Página {index} não encontrada em {self.pdf_path}")
+        count("paginas_renderizadas")
+        img = np.asarray(pil_pages[0].convert("L" if mode == "gray" else "RGB"))
+        if clip is not None:
+            img = img[clip_pixels(img.shape, clip)]
+        if mode == "bgr":
+            img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+        return np.ascontiguousarray(img)
+
+    def close(self):
+        pass
+
+
+def open_page_source(pdf_path: str, poppler_path: str = None, renderer: str = PAGE_RENDERER):
+    """Fonte de páginas do PDF: PyMuPDF, ou pdf2image se pedido/se o PyMuPDF não abrir."""
+    if renderer == "fitz":
+        try:
+            return FitzPageSource(pdf_path)
+        except Exception as e:
+            print(f"⚠️ PyMuPDF não abriu {pdf_path} ({e}); usando pdf2image.")
+    return Pdf2ImagePageSource(pdf_path, poppler_path)
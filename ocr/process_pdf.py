@@ -2,21 +2,20 @@ import os
 import cv2
 import pytesseract
 import fitz           # PyMuPDF
-from pdf2image import convert_from_path
 import numpy as np
 
 # ===========================
 # IMPORTANDO SEUS MÓDULOS OCR
 # ===========================
 from ocr.ocr_cleaner import clean_ocr_text, ocr_pdf_clean
-from ocr.ocr_table_detector import process_for_ocr
+from ocr.ocr_table_detector import process_for_ocr_array
 from ocr.postprocessor_fix_words import postprocess_ocr
+from ocr.page_cache import PageCache
 
 # ================================
 # IMPORTANDO SEUS MÓDULOS DE NOME
 # ================================
 from name_extractor.extract_name import extract_name
-from name_extractor.clean_text import basic_clean_text
 
 # ==================================
 # CONFIG - ajuste para sua máquina
@@ -51,8 +50,11 @@ def process_pdf(path_pdf: str):
     # ------------------------------------------------------
     # 1) OCR PROFISSIONAL DO SEU ARQUIVO (ocr_cleaner.py)
     # ------------------------------------------------------
+    # páginas renderizadas uma única vez e compartilhadas entre os estágios
+    pages = PageCache(path_pdf, poppler_path=POPPLER_PATH)
+
     print("[1] Rodando OCR limpo...")
-    full_text = ocr_pdf_clean(path_pdf)
+    full_text = ocr_pdf_clean(path_pdf, page_cache=pages)
 
     if not full_text.strip():
         print("⚠ OCR retornou texto vazio!")
@@ -64,12 +66,9 @@ def process_pdf(path_pdf: str):
     # ------------------------------------------------------
     print("[2] Detectando tabelas e bloco de nome...")
 
-    # converter 1ª página em imagem temp
-    pages = convert_from_path(path_pdf, dpi=300, poppler_path=POPPLER_PATH)
-    first_page_path = "_temp_first_page.jpg"
-    pages[0].save(first_page_path)
-
-    rotated, table_crop, name_crop = process_for_ocr(first_page_path)
+    # 1ª página direto da memória (já renderizada no passo 1)
+    rotated, table_crop, name_crop = process_for_ocr_array(
+        pages.get(0, dpi=300, mode="bgr", normalized=True), angle=0.0)
 
     print("✔ Table detector concluído.")
 
@@ -0,0 +1,126 @@
+"""
+OCR em modo TSV (image_to_data) com o resultado estruturado em memória.
+
+Sem PDF intermediário: a imagem vai direto para ocr.engine (tesserocr no
+processo quando disponível, senão pytesseract). Palavras com caixa e
+confiança, agrupadas em linhas e páginas:
+
+  OcrWord  -> texto, confiança (0–100), caixa (left, top, width, height)
+  OcrLine  -> palavras de uma linha (bloco/parágrafo/linha do Tesseract)
+  OcrPage  -> linhas da página + tamanho da imagem (e DPI das coordenadas)
+
+Funções principais:
+  ocr_image_tsv(img, lang, config, page_index) -> OcrPage
+  page_to_dict(page) / page_from_dict(d)       -> serialização (cache de OCR)
+"""
+
+from dataclasses import dataclass, field
+from typing import List
+from .engine import get_engine
+
+
+@dataclass
+class OcrWord:
+    text: str
+    conf: float
+    left: int
+    top: int
+    width: int
+    height: int
+
+    @property
+    def box(self):
+        return self.left, self.top, self.left + self.width, self.top + self.height
+
+
+@dataclass
+class OcrLine:
+    words: List[OcrWord] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return " ".join(w.text for w in self.words)
+
+    @property
+    def box(self):
+        xs0, ys0, xs1, ys1 = zip(*(w.box for w in self.words))
+        return min(xs0), min(ys0), max(xs1), max(ys1)
+
+    @property
+    def mean_conf(self) -> float:
+        confs = [w.conf for w in self.words if w.conf >= 0]
+        return sum(confs) / len(confs) if confs else 0.0
+
+
+@dataclass
+class OcrPage:
+    index: int
+    width: int
+    height: int
+    lines: List[OcrLine] = field(default_factory=list)
+    dpi: int = 0       # resolução do sistema de coordenadas das caixas (0 = desconhecida)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(l.text for l in self.lines)
+
+    @property
+    def words(self) -> List[OcrWord]:
+        return [w for l in self.lines for w in l.words]
+
+    @property
+    def mean_conf(self) -> float:
+        confs = [w.conf for w in self.words if w.conf >= 0]
+        return sum(confs) / len(confs) if confs else 0.0
+
+
+def parse_tsv(data: dict, page_index: int = 0, size=(0, 0)) -> OcrPage:
+    """Converte o dicionário de image_to_data(output_type=DICT) em OcrPage."""
+    page = OcrPage(index=page_index, width=size[0], height=size[1])
+    current_key = None
+    for i, word in enumerate(data["text"]):
+        word = (word or "").strip()
+        if not word:
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        if key != current_key:
+            page.lines.append(OcrLine())
+            current_key = key
+        page.lines[-1].words.append(OcrWord(
+            text=word,
+            conf=float(data["conf"][i]),
+            left=int(data["left"][i]),
+            top=int(data["top"][i]),
+            width=int(data["width"][i]),
+            height=int(data["height"][i]),
+        ))
+    return page
+
+
+def ocr_image_tsv(img, lang: str = "por", config: str = "", page_index: int = 0) -> OcrPage:
+    """OCR de uma imagem (array numpy ou PIL) devolvendo a estrutura de palavras."""
+    data = get_engine().to_data(img, lang=lang, config=config)
+    if hasattr(img, "shape"):
+        size = (img.shape[1], img.shape[0])
+    else:
+        size = img.size
+    return parse_tsv(data, page_index=page_index, size=size)
+
+
+def page_to_dict(page: OcrPage) -> dict:
+    """OcrPage -> dict só com tipos JSON (usado pelo cache de OCR em disco)."""
+    return {
+        "index": page.index,
+        "width": page.width,
+        "height": page.height,
+        "dpi": page.dpi,
+        "lines": [[[w.text, w.conf, w.left, w.top, w.width, w.height] for w in l.words]
+                  for l in page.lines],
+    }
+
+
+def page_from_dict(d: dict) -> OcrPage:
+    page = OcrPage(index=d["index"], width=d["width"], height=d["height"], dpi=d.get("dpi", 0))
+    for words in d["lines"]:
+        page.lines.append(OcrLine([OcrWord(*w) for w in words]))
+    return page
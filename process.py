@@ -1,215 +1,335 @@
 import os
-from utils import extract_text_with_ocrmypdf, preprocess_image_opencv, detect_orientation_tesseract, clean_text, get_num_pages
-from extract_name_pipeline import extract_name_pipeline
-from pdf2image import convert_from_path
-from config import INPUT_FOLDER, POPPLER_PATH, MIN_NAME_LEN
-import pytesseract
+import instrumentation
+from utils import (extract_pages_layered, preprocess_image_opencv, detect_orientation_pdf,
+                   clean_text, get_num_pages, PageText, FONTE_TEXTO, FONTE_VAZIA)
+from extract_name_pipeline import extract_name_pipeline, extract_name_pipeline_scored
+from ocr.page_cache import PageCache
+from ocr.ocr_cache import cached_page_text, cached_regions
+from ocr.engine import get_engine
+from document import Document, as_document
+from config import (INPUT_FOLDER, POPPLER_PATH, MIN_NAME_LEN, PROGRESSIVE_OCR,
+                    PROGRESSIVE_MIN_CONFIDENCE, PROGRESSIVE_FULL_TIPOS, PAGE_CACHE_MAX_MB,
+                    RENDER_DPI_DETECT, RENDER_DPI_OCR, OCR_ADAPTIVE_DPI, OCR_DPI_STEPS)
 import traceback
-import numpy as np
-import cv2
-from PIL import Image
 from motoristas import motoristas
-from extract_tipo import extract_tipo
-from date_extractor import extract_final_date
+from extract_tipo import extract_tipo, extract_tipo_scored
+from date_extractor import extract_final_date, extract_final_date_scored
 from extract_motivo import extract_motivo
 from rename_pdf import rename_pdf
-from nlp_loader import load_ner_model
-nlp_name = load_ner_model()
 
-def process_pdf(file):
+
+def _weak_field(text, path, num_pages, skip_tipos=()):
+    """
+    Roda os extratores no `text` e devolve (tipo, motivo), com `motivo` descrevendo
+    o primeiro campo (tipo/nome/data) com confiança baixa — None se todos estão bons
+    ou se o tipo está em `skip_tipos`.
+    """
+    # um Document só: tipo, nome e data reaproveitam as mesmas visões normalizadas
+    text = as_document(text)
+    orientation = detect_orientation_pdf(path)
+    tipo, conf_tipo = extract_tipo_scored(text, orientation, num_pages)
+    if tipo in skip_tipos:
+        return tipo, None
+    if conf_tipo < PROGRESSIVE_MIN_CONFIDENCE:
+        return tipo, f"tipo={tipo} ({conf_tipo:.2f})"
+
+    nome, conf_nome = extract_name_pipeline_scored(text)
+    if conf_nome < PROGRESSIVE_MIN_CONFIDENCE:
+        return tipo, f"nome={nome} ({conf_nome:.2f})"
+
+    data, conf_data = extract_final_date_scored(text, tipo)
+    if conf_data < PROGRESSIVE_MIN_CONFIDENCE:
+        return tipo, f"data={data} ({conf_data:.2f})"
+
+    return tipo, None
+
+
+def _needs_more_pages(text, path, num_pages):
     """
-    Processa um PDF: OCR (OCRmyPDF -> fallback) -> aplica ocr_cleaner
-    -> usa ocr_table_detector para melhorar o crop (se possível)
-    -> aplica postprocessor_fix_words -> extrai tipo/data/nome/motivo -> renomeia.
+    Modo progressivo: decide, só com o texto da página 1, se vale OCRizar o resto.
+    Continua quando o tipo é de documento multipágina (ponto) ou quando alguma
+    extração ficou com confiança baixa.
+    """
+    tipo, fraco = _weak_field(text, path, num_pages, skip_tipos=PROGRESSIVE_FULL_TIPOS)
+    if tipo in PROGRESSIVE_FULL_TIPOS:
+        return True, f"tipo={tipo}"
+    if fraco:
+        return True, fraco
+    return False, f"tipo={tipo}, nome e data ok"
+
+
+def _refine_first_page(path, page_texts, pages, num_pages):
+    """
+    DPI adaptativo guiado pelos campos: a página 1 lida em DPI baixo (confiança
+    das palavras boa) volta ao OCR em OCR_DPI_STEPS[0] se tipo/nome/data ainda
+    saem com confiança baixa.
+    """
+    first = page_texts[0] if page_texts else None
+    if (not OCR_ADAPTIVE_DPI or not OCR_DPI_STEPS or first is None or first.index != 0
+            or first.ocr is None or first.ocr.dpi >= OCR_DPI_STEPS[0]):
+        return page_texts
+
+    _, fraco = _weak_field(first.text, path, num_pages)
+    if fraco is None:
+        return page_texts
+    print(f"🔍 Página 1 lida em {first.ocr.dpi} DPI com {fraco}; OCR de novo em {OCR_DPI_STEPS[0]} DPI.")
+    novo = extract_pages_layered(path, pages=[0], page_cache=pages, dpi=OCR_DPI_STEPS[0])
+    if novo and novo[0].text.strip():
+        return novo + page_texts[1:]
+    return page_texts
+
+
+def _ocr_regions(page_gray, boxes):
+    """
+    OCR das regiões (nome/tabela) da página: pré-processa a página uma vez e
+    manda uma única imagem ao motor, com uma caixa por região (cache por região).
+    """
+    return cached_regions(
+        page_gray, boxes, lang="por", etapa="regioes_opencv",
+        preprocess=lambda p: preprocess_image_opencv(p, deskew=False))
+
+
+def ocr_page(file, page_index):
+    """
+    Tarefa de página (documentos grandes divididos pelo agendador do main.py):
+    extrai/OCRiza só a página `page_index` e devolve o PageText dela.
+    """
+    path = os.path.join(INPUT_FOLDER, file)
+    pages = PageCache(path, poppler_path=POPPLER_PATH)
+    try:
+        result = extract_pages_layered(path, pages=[page_index], page_cache=pages)
+        return result[0] if result else PageText(page_index, FONTE_VAZIA, "", None)
+    finally:
+        pages.clear()
+
+
+def process_pdf(file, page_texts=None, rename=True):
+    """
+    Processa um PDF: OCR (OCRmyPDF -> fallback) -> usa ocr_table_detector para
+    melhorar o crop (se possível) -> limpeza leve (clean_text)
+    -> extrai tipo/data/nome/motivo -> renomeia.
 
     Recebe o nome do arquivo (apenas o nome, não o caminho).
     Usa variáveis globais definidas no topo do seu script como INPUT_FOLDER, POPPLER_PATH, etc.
+
+    `page_texts`: PageText de todas as páginas, já OCRizadas em paralelo
+    (ocr_page); quando passado, o passo 1 é pulado.
+    `rename=False` só extrai os campos, sem renomear (benchmark).
+
+    Retorna um dict com arquivo, status ("ok"/"erro"), campos extraídos e o novo nome.
     """
     path = os.path.join(INPUT_FOLDER, file)
-    temp_img_path = None
+    result = {"arquivo": file, "status": "erro"}
+    # cada página é renderizada no máximo uma vez e compartilhada entre os estágios
+    # (com orçamento de memória: páginas antigas saem do cache quando ele enche)
+    pages = PageCache(path, poppler_path=POPPLER_PATH, max_bytes=PAGE_CACHE_MAX_MB * 1024 * 1024)
+
+    # parede/CPU por etapa + contadores (páginas, Tesseract, cache) — ver instrumentation.py
+    metricas = instrumentation.begin(file)
+    marcar = metricas.mark
 
     try:
         print(f"[DEBUG] Iniciando processamento de: {file}", flush=True)
         print(f"\n📄 Processando: {file}")
 
-        # 1) Tenta OCRmyPDF primeiro (função já definida no arquivo)
+        # 1) Camada de texto do PDF quando ela presta; OCR (Tesseract TSV/OCRmyPDF) só nas páginas escaneadas
         text = ""
+        num_pages = get_num_pages(path)
         try:
-            text = extract_text_with_ocrmypdf(path)
+            if page_texts is not None:
+                # páginas já OCRizadas em paralelo pelo agendador — só remonta em ordem
+                page_texts = sorted(page_texts, key=lambda p: p.index)
+            elif PROGRESSIVE_OCR and num_pages > 1:
+                # Progressivo: página 1 primeiro; demais só se a classificação pedir
+                page_texts = extract_pages_layered(path, pages=[0], page_cache=pages)
+                page_texts = _refine_first_page(path, page_texts, pages, num_pages)
+                primeira = "".join(p.text for p in page_texts).strip()
+                mais, motivo_ocr = _needs_more_pages(primeira, path, num_pages)
+                if mais:
+                    print(f"📑 Página 1 insuficiente ({motivo_ocr}); OCR das demais páginas.")
+                    page_texts += extract_pages_layered(path, pages=range(1, num_pages), page_cache=pages)
+                else:
+                    print(f"📑 Página 1 basta ({motivo_ocr}); {num_pages - 1} página(s) sem OCR.")
+            else:
+                # PageText por página: fonte, texto e palavras com caixa (quando OCR)
+                page_texts = extract_pages_layered(path, page_cache=pages)
+                page_texts = _refine_first_page(path, page_texts, pages, num_pages)
+            text = "".join(p.text for p in page_texts).strip()
             if text:
-                print("🔎 Texto obtido via OCRmyPDF.")
+                resumo = ", ".join(f"p{p.index + 1}={p.fonte}" for p in page_texts)
+                print(f"🔎 Texto obtido por página: {resumo}")
         except Exception as e:
-            print(f"⚠️ OCRmyPDF falhou: {e}")
-        
+            print(f"⚠️ OCR inicial falhou: {e}")
+            page_texts = page_texts or []
 
-        # 2) Se OCRmyPDF vazio, tenta o pipeline robusto do seu ocr_cleaner (se disponível)
-        oc_cleaner = None
-        table_detector = None
-        postproc = None
-        try:
-            import ocr_cleaner as oc_cleaner
-        except Exception:
-            oc_cleaner = None
+        fontes = [p.fonte for p in page_texts]
+        # PDF nascido digital: nenhuma página precisa de raster/Tesseract
+        digital = bool(fontes) and all(f == FONTE_TEXTO for f in fontes)
 
-        try:
-            import ocr_table_detector as table_detector
-        except Exception:
-            table_detector = None
+        marcar("ocr")
 
+        # 2) Se o OCR inicial veio vazio, OCR das páginas inteiras como imagem.
+        # ocr_cleaner e postprocessor_fix_words ficam fora do texto do documento:
+        # o clean_ocr_text tira acentos e quebras de linha e o postprocess_ocr cola
+        # palavras ("venho por meio" -> "venhopormeio") e pode devolver uma entrada
+        # do roster no lugar do texto — as regras de tipo/motivo/data deixam de casar.
+        table_detector = None
         try:
-            import postprocessor_fix_words as postproc
+            from ocr import ocr_table_detector as table_detector
         except Exception:
-            postproc = None
+            table_detector = None
 
         if not text or not text.strip():
-            if oc_cleaner and hasattr(oc_cleaner, "ocr_pdf_clean"):
-                try:
-                    print("🔁 Tentando OCR com ocr_cleaner.ocr_pdf_clean(...)")
-                    text = oc_cleaner.ocr_pdf_clean(path)
-                except Exception as e:
-                    print(f"⚠️ ocr_cleaner.ocr_pdf_clean falhou: {e}")
-            else:
-                # fallback: converte páginas e usa pytesseract direto (igual antes)
-                try:
-                    print("🔁 Fallback: convertendo páginas e usando pytesseract (imagem).")
-                    pages = convert_from_path(path, dpi=300, poppler_path=POPPLER_PATH)
-                    text_lines = []
-                    for p in pages:
-                        img_proc = preprocess_image_opencv(p)
-                        page_text = pytesseract.image_to_string(img_proc, lang='por')
-                        text_lines.append(page_text)
-                    text = "\n".join(text_lines)
-                except Exception as fe:
-                    print(f"❌ Fallback de OCR por imagens falhou: {fe}")
-                    traceback.print_exc()
-                    text = ""
+            try:
+                print("🔁 Fallback: convertendo páginas e usando pytesseract (imagem).")
+                text_lines = []
+                for i in range(pages.num_pages):
+                    # página já normalizada pela geometria do PageCache: sem deskew de novo
+                    page_text = cached_page_text(
+                        pages, i, etapa="fallback_opencv", normalized=True, mode="gray",
+                        ocr_fn=lambda p: get_engine().to_string(
+                            preprocess_image_opencv(p, deskew=False), lang='por'))
+                    text_lines.append(page_text)
+                text = "\n".join(text_lines)
+            except Exception as fe:
+                print(f"❌ Fallback de OCR por imagens falhou: {fe}")
+                traceback.print_exc()
+                text = ""
+
+        marcar("ocr_fallback")
 
         # 3) Preparar imagem para detector de tabela / bloco de nome (se disponível)
-        # Vamos extrair a primeira página como imagem temporária e chamar process_for_ocr(path)
+        # A primeira página vai direto da memória para process_for_ocr_array (sem PNG temporário)
+        # (reaproveita a página já renderizada pelo fallback, se houver)
+        # Geometria (rotação grossa + inclinação) calculada uma vez e reaproveitada
+        # pelo OCR, pelo detector de tabela, pela orientação e pelo OCR de datas.
+        # O detector roda numa renderização cinza de DPI baixo; só o OCR usa 300 DPI.
         try:
-            pages = convert_from_path(path, dpi=300, poppler_path=POPPLER_PATH)
-            first_page_pil = pages[0] if pages else None
+            first_page = (pages.get(0, dpi=RENDER_DPI_DETECT, mode="gray", normalized=True)
+                          if pages.num_pages and not digital else None)
         except Exception:
-            first_page_pil = None
+            first_page = None
 
-        rotated = table_crop = name_crop = None
-        if table_detector and first_page_pil is not None:
+        rotated = table_box = name_box = None
+        if table_detector and first_page is not None:
             try:
-                # salva temporariamente a primeira página para que o module use cv2.imread(path)
-                import tempfile
-                tempf = tempfile.NamedTemporaryFile(suffix=".png", delete=False)
-                temp_img_path = tempf.name
-                tempf.close()
-
-                # converter PIL -> BGR e salvar com cv2
-                np_img = np.array(first_page_pil)
-                # PIL dá RGB; cv2 espera BGR ao salvar — convertemos
-                np_img_bgr = cv2.cvtColor(np_img, cv2.COLOR_RGB2BGR)
-                cv2.imwrite(temp_img_path, np_img_bgr)
-
-                rotated, table_crop, name_crop = table_detector.process_for_ocr(temp_img_path)
+                # página já normalizada: sem Hough; caixas levadas para a página do OCR
+                _, small_table, small_name = table_detector.process_for_ocr_boxes(first_page, angle=0.0)
+                rotated = pages.get(0, dpi=RENDER_DPI_OCR, mode="gray", normalized=True)
+                factor = RENDER_DPI_OCR / RENDER_DPI_DETECT
+                table_box = table_detector.scale_box(small_table, factor, rotated.shape)
+                name_box = table_detector.scale_box(small_name, factor, rotated.shape)
                 print("🔎 Detector de tabela executado com sucesso.")
             except Exception as e:
                 print(f"⚠️ ocr_table_detector falhou: {e}")
-                rotated = table_crop = name_crop = None
+                rotated = table_box = name_box = None
 
-        # 4) Se detector devolveu um crop de nome ou tabela, tentar extrair OCR específico dessas regiões
+        marcar("tabela")
+
+        # 4) Se detector devolveu caixas de nome/tabela, OCR específico dessas regiões
+        # (uma imagem no motor, uma caixa por região — SetRectangle no tesserocr)
         text_from_regions = ""
+        text_name = ""
         try:
-            if name_crop is not None:
-                # name_crop é numpy array (BGR). Converter para PIL e rodar Tesseract
-                pil_name = Image.fromarray(cv2.cvtColor(name_crop, cv2.COLOR_BGR2RGB))
-                processed_name_img = preprocess_image_opencv(pil_name)
-                text_name = pytesseract.image_to_string(processed_name_img, lang='por')
+            if rotated is not None:
+                text_name, text_table = _ocr_regions(rotated, [name_box, table_box])
                 text_from_regions += ("\n" + text_name) if text_name else ""
-            if table_crop is not None:
-                pil_table = Image.fromarray(cv2.cvtColor(table_crop, cv2.COLOR_BGR2RGB))
-                processed_table_img = preprocess_image_opencv(pil_table)
-                text_table = pytesseract.image_to_string(processed_table_img, lang='por')
                 text_from_regions += ("\n" + text_table) if text_table else ""
         except Exception as e:
-            print(f"[DEBUG] Iniciando processamento de: {filename}", flush=True)
             print(f"⚠️ Extração via regiões detectadas falhou: {e}")
 
+        marcar("regioes")
+
         # 5) Combine textos: prioriza texto das regiões se forem mais longos/úteis
         if text_from_regions and len(text_from_regions.strip()) > len(text.strip()) / 2:
             # usar texto das regiões (quando faz sentido)
             text = text + "\n\n" + text_from_regions
 
-        # 6) Detectar orientação (usa sua função existente). Se não houver página, assume vertical.
+        # 6) Detectar orientação. Se não houver página, assume vertical.
         try:
-            if first_page_pil is not None:
-                orientation = detect_orientation_tesseract(first_page_pil)
+            if digital:
+                orientation = detect_orientation_pdf(path)
+            elif first_page is not None:
+                # mesma geometria do passo 3 (sem outro image_to_osd na página inteira)
+                orientation = pages.geometry(0).orientation
             else:
                 orientation = "vertical"
         except Exception:
             orientation = "vertical"
 
-        # 7) Limpeza com ocr_cleaner.clean_ocr_text (se disponível)
-        try:
-            if oc_cleaner and hasattr(oc_cleaner, "clean_ocr_text"):
-                text = oc_cleaner.clean_ocr_text(text)
-            else:
-                # sua função local clean_text já existe — usamos como fallback leve
-                text = clean_text(text)
-        except Exception as e:
-            print(f"⚠️ Falha ao aplicar ocr_cleaner.clean_ocr_text: {e}")
+        marcar("orientacao")
 
-        # 8) Pós-processamento de palavras (postprocessor_fix_words.postprocess_ocr), se disponível
+        # 7) Limpeza leve (clean_text): mantém acentos, linhas e espaços entre palavras
         try:
-            if postproc and hasattr(postproc, "postprocess_ocr"):
-                # postprocess_ocr pode aceitar lista motoristas para alinhamento de nomes
-                text_post = postproc.postprocess_ocr(text, motoristas)
-                if text_post:
-                    text = text_post
+            text = clean_text(text)
         except Exception as e:
-            print(f"⚠️ Falha no postprocessor_fix_words.postprocess_ocr: {e}")
+            print(f"⚠️ Falha ao aplicar clean_text: {e}")
 
-        # 9) Número de páginas (função já presente)
-        num_pages = get_num_pages(path)
+        # 8) (sem pós-processamento de palavras no texto inteiro — ver passo 2)
+
+        marcar("limpeza")
 
-        # 10) Extrair tipo/data/nome/motivo
-        tipo = extract_tipo(text, orientation, num_pages)
+        # 9) Número de páginas (já lido no passo 1)
+
+        # 10) Extrair tipo/data/nome/motivo — todos sobre o mesmo Document: cada
+        # visão normalizada do texto é calculada uma vez e as posições batem entre estágios
+        doc = Document(text, pages=page_texts)
+        tipo = extract_tipo(doc, orientation, num_pages)
+        marcar("tipo")
         date = extract_final_date(
-            text,
+            doc,
             tipo,
-            ocr_image_path=temp_img_path
+            ocr_image=pages.get(0, dpi=RENDER_DPI_OCR, mode="gray", normalized=True) if first_page is not None else None
         )
+        marcar("data")
 
-        # Para extração de nome: se postprocessor devolveu um nome exato (alguns postprocessors retornam orig),
-        # preferimos validar com seu name_extractor pipeline. Se texto contém nome isolado (postproc returned),
-        # tentamos usar extract_name_pipeline; caso retorne DESCONHECIDO, tentamos heurística rápida.
-        nome = extract_name_pipeline(text)
-        if (not nome or nome == "DESCONHECIDO") and postproc and hasattr(postproc, "postprocess_ocr"):
-            # postproc.postprocess_ocr pode ter retornado um nome exato — já aplicado acima.
-            # Se ainda desconhecido, vamos tentar buscar palavras capitalizadas no top region (se disponível).
+        # Nome pelo name_extractor; se ficar DESCONHECIDO, o postprocess_ocr é aplicado
+        # só no recorte do bloco do nome (nunca no texto do documento).
+        nome = extract_name_pipeline(doc)
+        if (not nome or nome == "DESCONHECIDO") and text_name:
             try:
-                if name_crop is not None:
-                    pil_name = Image.fromarray(cv2.cvtColor(name_crop, cv2.COLOR_BGR2RGB))
-                    small_text = pytesseract.image_to_string(preprocess_image_opencv(pil_name), lang='por')
-                    small_text = small_text.strip()
-                    if small_text and len(small_text) > MIN_NAME_LEN:
-                        candidate = postproc.postprocess_ocr(small_text, motoristas) if postproc else small_text
-                        if candidate and candidate != "":
-                            nome = candidate
+                from ocr import postprocessor_fix_words as postproc
+                # texto do bloco do nome já lido no passo 4 (sem novo OCR)
+                small_text = text_name.strip()
+                if len(small_text) > MIN_NAME_LEN:
+                    candidate = postproc.postprocess_ocr(small_text, motoristas)
+                    # com nome do roster no recorte ele devolve a entrada (cod, nome), não texto
+                    if isinstance(candidate, str) and candidate:
+                        nome = candidate
             except Exception:
                 pass
 
-        motivo = extract_motivo(text) 
+        marcar("nome")
+
+        motivo = extract_motivo(doc)
 
         print(f"➡ Tipo: {tipo} | Data: {date} | Nome: {nome} | Motivo: {motivo}")
 
+        marcar("motivo")
+
         # 11) Renomear arquivo
-        rename_pdf(path, tipo, nome, date, motivo)
+        new_path = rename_pdf(path, tipo, nome, date, motivo) if rename else None
+        marcar("rename")
+
+        result.update({
+            "status": "ok",
+            "tipo": tipo,
+            "data": date,
+            "nome": nome[1] if isinstance(nome, list) else nome,
+            "motivo": motivo,
+            "novo_nome": os.path.basename(new_path) if new_path else None,
+        })
 
     except Exception as e:
         print(f"❌ Erro ao processar {file}: {e}")
+        result["erro"] = str(e)
         traceback.print_exc()
 
     finally:
-        # remover arquivo temporário de imagem se criado
-        try:
-            if temp_img_path and os.path.exists(temp_img_path):
-                os.remove(temp_img_path)
-        except Exception:
-            pass
\ No newline at end of file
+        # libera os rasters da memória antes da próxima tarefa do worker
+        pages.clear()
+
+    result["tempos"] = metricas.tempos()
+    result["metricas"] = instrumentation.end()
+    result["tempos"]["total"] = result["metricas"]["total"]["wall"]
+    return result
\ No newline at end of file
@@ -0,0 +1,43 @@
+from keyword_rules import Rule
+
+# Tabelas de palavras-chave dos classificadores (compiladas em keyword_rules.py).
+# Texto comparado já normalizado: minúsculo e sem acento (utils.normalize_text).
+#
+# Rule(nome, classe, peso, palavras, inteiras)
+#   palavras -> basta aparecer como trecho ("atend" pega "atendimento")
+#   inteiras -> só contam como palavra isolada ("dr" não pega "pedro")
+# Cada regra soma o seu peso UMA vez, qualquer que seja o número de ocorrências.
+
+# extract_tipo: soma dos pesos por classe; vence o maior
+TIPO_RULES = [
+    # 1) Palavras-chave de forte evidência
+    Rule("atestado_forte", "atestado", 40, ["atestado", "consultorio"], inteiras=["cid", "dr"]),
+    Rule("advertencia_forte", "advertencia", 40,
+         ["advertencia", "intrajornada", "descumprimento", "advertido"]),
+    Rule("carta_forte", "carta", 40, ["prezado", "venho por meio desta", "ao senhor"]),
+    Rule("ponto_forte", "ponto", 40,
+         ["registro de ponto", "diario de bordo", "horas", "controle de jornada"]),
+
+    # 2) Vocabulário de advertência
+    Rule("advertencia_conduta", "advertencia", 20,
+         ["colaborador", "conduta", "motivo", "notificado", "empresa"]),
+
+    # 3) Indícios médios
+    Rule("atestado_medio", "atestado", 15,
+         ["compareceu", "afastamento", "atend", "clinica", "medico"], inteiras=["cid"]),
+]
+
+# extract_motivo: vence a regra de MAIOR peso encontrada (prioridade)
+MOTIVO_RULES = [
+    Rule("celular", "CELULAR", 60, ["celular"]),
+    Rule("distracao", "DISTRACAO", 50, ["distracao", "distra"]),
+    Rule("cinto", "CINTO", 40, ["cinto"]),
+    Rule("velocidade", "VELOCIDADE", 30, ["velocidade"]),
+    Rule("drogas", "DROGAS", 20, ["drogas", "fumando", "bebendo"]),
+    Rule("jornada", "JORNADA", 10, ["jornada"]),
+]
+MOTIVO_PADRAO = "INTRAJORNADA"
+
+# Trechos só contados (sem peso próprio): extract_tipo usa o total de "00:00"
+# como sinal de tabela de horários
+TIPO_CONTAGENS = ["00:00:00", "00:00"]
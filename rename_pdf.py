@@ -30,5 +30,7 @@ def rename_pdf(file_path, tipo, nome, data_str, motivo_str):
     try:
         os.rename(file_path, new_path)
         print(f"✅ Renomeado para: {os.path.basename(new_path)}")
+        return new_path
     except Exception as e:
-        print(f"⚠️ Erro ao renomear {file_path}: {e}")
\ No newline at end of file
+        print(f"⚠️ Erro ao renomear {file_path}: {e}")
+        return None
\ No newline at end of file
@@ -13,64 +13,257 @@ import unicodedata
 
 # EXTRACAO DE TEXTO
 
-from PyPDF2 import PdfReader
+from collections import namedtuple
+from functools import partial
+from config import OCR_BACKEND, POPPLER_PATH, OCR_ADAPTIVE_DPI
+from ocr.page_cache import PageCache
+from ocr.tesseract_tsv import ocr_image_tsv, page_to_dict, page_from_dict
+from ocr.adaptive_ocr import ocr_page_adaptive, cache_settings as adaptive_cache_settings
+from ocr.ocr_cache import get_ocr_cache, file_digest, cached_image_to_string
+from ocr.engine import get_engine
+from concurrency import worker_threads
+from instrumentation import count
+from ocr.preprocess import preprocess_gray
 
 
-def extract_text_with_ocrmypdf(path):
-    try:
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
-            out = tmp.name
+# Camada de texto: mínimo de caracteres úteis e proporção de caracteres "limpos"
+# para considerar que a página NÃO precisa de OCR (PDFs exportados do Word etc.)
+TEXT_LAYER_MIN_CHARS = 80
+TEXT_LAYER_MIN_RATIO = 0.85
+
+# Origem do texto de cada página
+FONTE_TEXTO = "texto"   # camada de texto do PDF (sem OCR)
+FONTE_OCR = "ocr"       # OCRmyPDF/Tesseract
+FONTE_VAZIA = "vazia"   # nenhuma das duas deu texto
+
+# Resultado por página: `ocr` é o OcrPage (palavras + caixas + confiança)
+# quando o backend Tesseract TSV foi usado, senão None
+PageText = namedtuple("PageText", "index fonte text ocr")
+
+
+def text_layer_ok(text):
+    """Decide se o texto extraído da camada do PDF é bom o suficiente para pular o OCR."""
+    t = (text or "").strip()
+    if len(t) < TEXT_LAYER_MIN_CHARS:
+        return False
+    if "\ufffd" in t:
+        return False
+    limpos = sum(1 for c in t if c.isalnum() or c.isspace() or c in ".,;:/-()%ºª'\"")
+    return limpos / len(t) >= TEXT_LAYER_MIN_RATIO
+
+
+def classify_pdf_pages(path, pages=None):
+    """
+    Pré-classificação via PyMuPDF: lê a camada de texto de cada página
+    (ou só das páginas `pages`, 0-based).
+    Retorna lista com o texto da página quando ele é aproveitável ou None
+    quando a página é escaneada e precisa de OCR.
+    """
+    result = []
+    with fitz.open(path) as doc:
+        for i in (range(doc.page_count) if pages is None else pages):
+            text = doc[i].get_text("text")
+            result.append(text if text_layer_ok(text) else None)
+    return result
+
+
+def _run_ocrmypdf(path, pages=None):
+    """
+    Roda OCRmyPDF e devolve {indice_0_based: texto}, lido do sidecar de texto
+    (sem reabrir o PDF gerado). `pages` (1-based) limita o OCR às páginas escaneadas.
+    Tudo é gravado num diretório temporário que é apagado ao final.
+    """
+    kwargs = {}
+    if pages:
+        kwargs["pages"] = ",".join(str(p) for p in pages)
 
+    count("ocrmypdf_chamadas")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        out = os.path.join(tmpdir, "ocr.pdf")
+        sidecar = os.path.join(tmpdir, "ocr.txt")
         ocrmypdf.ocr(
             input_file=path,
             output_file=out,
+            sidecar=sidecar,
+            output_type="pdf",   # sem conversão PDF/A (Ghostscript) — só o sidecar interessa
             force_ocr=True,
-            skip_text=True,
             optimize=0,          # <<< DESLIGA PNGQUANT/JBIG2 (parou o WinError)
             use_threads=True,
-            progress_bar=False
+            jobs=worker_threads(),   # orçamento do worker (concurrency.py)
+            progress_bar=False,
+            **kwargs
         )
+        with open(sidecar, "r", encoding="utf-8") as f:
+            por_pagina = f.read().split("\f")
 
-        # Lê o PDF gerado pelo OCR
-        from PyPDF2 import PdfReader
-        reader = PdfReader(out)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
+    wanted = [p - 1 for p in pages] if pages else range(len(por_pagina))
+    return {i: por_pagina[i] if i < len(por_pagina) else "" for i in wanted}
 
-        return text.strip()
 
-    except Exception as e:
-        return ""
+def _ocrmypdf_pages(path, pages=None, digest=None):
+    """
+    _run_ocrmypdf com cache por página (hash do PDF): só as páginas que
+    não estão no cache de OCR passam pelo OCRmyPDF.
+    """
+    cache = get_ocr_cache()
+    if cache is None:
+        return _run_ocrmypdf(path, pages)
+    if not pages:
+        pages = list(range(1, get_num_pages(path) + 1))
+        if not pages:
+            return _run_ocrmypdf(path)
+
+    digest = digest or file_digest(path)
+    keys = {p - 1: cache.key(digest, pagina=p - 1, etapa="ocrmypdf") for p in pages}
+    result = {}
+    for i, key in keys.items():
+        hit = cache.get(key)
+        if hit is not None:
+            result[i] = hit["text"]
+
+    missing = [i + 1 for i in keys if i not in result]
+    if missing:
+        for i, t in _run_ocrmypdf(path, missing).items():
+            cache.put(keys[i], {"text": t, "page": None})
+            result[i] = t
+    return result
+
+
+def _tesseract_pages(path, pages=None, page_cache=None, dpi=None):
+    """
+    OCR direto com Tesseract (TSV) sobre as páginas do PageCache.
+    Devolve {indice_0_based: OcrPage}. Páginas já no cache de OCR (mesmo PDF,
+    mesmas configurações) voltam com texto e caixas sem renderizar nem OCRizar.
+    `dpi=None`: DPI adaptativo (ocr/adaptive_ocr.py) se OCR_ADAPTIVE_DPI, senão 300.
+    """
+    adaptive = dpi is None and OCR_ADAPTIVE_DPI
+    dpi = dpi or 300
+    if page_cache is None:
+        page_cache = PageCache(path, poppler_path=POPPLER_PATH)
+    indices = [p - 1 for p in pages] if pages else range(page_cache.num_pages)
+    cache = get_ocr_cache()
+    # no modo adaptativo a leitura depende dos limiares e DPIs de config, não de um DPI
+    dpi_key = adaptive_cache_settings() if adaptive else dpi
+
+    result = {}
+    for i in indices:
+        key = None
+        if cache is not None:
+            key = cache.key(page_cache.digest, pagina=i, dpi=dpi_key,
+                            lang="por", etapa="tsv_normalizada", modo="gray")
+            hit = cache.get(key)
+            if hit is not None:
+                result[i] = page_from_dict(hit["page"])
+                continue
+        # página em pé e reta (geometria calculada uma vez e reaproveitada pelos outros estágios),
+        # já em cinza: o Tesseract binariza em 1 canal de qualquer jeito
+        if adaptive:
+            page = ocr_page_adaptive(page_cache, i, lang="por")
+        else:
+            page = ocr_image_tsv(page_cache.get(i, dpi=dpi, mode="gray", normalized=True),
+                                 lang="por", page_index=i)
+            page.dpi = dpi
+        if cache is not None:
+            cache.put(key, {"text": page.text, "page": page_to_dict(page)})
+        result[i] = page
+    return result
+
+
+def _ocr_pages(path, pages=None, page_cache=None, dpi=None):
+    """{indice: (texto, OcrPage ou None)} conforme config.OCR_BACKEND."""
+    if OCR_BACKEND == "ocrmypdf":
+        digest = page_cache.digest if page_cache is not None else None
+        return {i: (t, None) for i, t in _ocrmypdf_pages(path, pages, digest).items()}
+    return {i: (p.text, p) for i, p in _tesseract_pages(path, pages, page_cache, dpi).items()}
+
+
+def extract_pages_layered(path, pages=None, page_cache=None, dpi=None):
+    """
+    Extrai o texto página a página: usa a camada de texto quando ela é boa
+    e só manda para o OCR as páginas escaneadas.
+    `pages` (0-based) restringe a extração a essas páginas (modo progressivo).
+    `dpi` força o DPI do OCR Tesseract (None = adaptativo, ver _tesseract_pages).
+    Retorna lista de PageText(index, fonte, text, ocr).
+    """
+    pages = list(pages) if pages is not None else None
+    try:
+        layer = classify_pdf_pages(path, pages)
+    except Exception:
+        layer = []
+
+    if not layer:
+        # PyMuPDF não conseguiu abrir: OCR direto das páginas pedidas
+        try:
+            ocr = _ocr_pages(path, pages=[p + 1 for p in pages] if pages else None,
+                             page_cache=page_cache, dpi=dpi)
+        except Exception:
+            return []
+        return [PageText(i, FONTE_OCR if t.strip() else FONTE_VAZIA, t, o)
+                for i, (t, o) in sorted(ocr.items())]
+
+    indices = pages if pages is not None else list(range(len(layer)))
+    scanned = [i + 1 for i, t in zip(indices, layer) if t is None]
+    ocr = {}
+    if scanned:
+        try:
+            ocr = _ocr_pages(path, pages=scanned, page_cache=page_cache, dpi=dpi)
+        except Exception:
+            ocr = {}
+
+    result = []
+    for i, t in zip(indices, layer):
+        if t is not None:
+            result.append(PageText(i, FONTE_TEXTO, t, None))
+            continue
+        t, o = ocr.get(i, ("", None))
+        result.append(PageText(i, FONTE_OCR if t.strip() else FONTE_VAZIA, t, o))
+    return result
+
+
+def extract_text_layered(path, pages=None, page_cache=None):
+    """
+    Igual a extract_pages_layered, mas devolve (texto, fontes) — fontes[i]
+    diz como a i-ésima página pedida foi obtida (FONTE_TEXTO, FONTE_OCR ou FONTE_VAZIA).
+    """
+    result = extract_pages_layered(path, pages, page_cache)
+    return "".join(p.text for p in result).strip(), [p.fonte for p in result]
+
+
+def extract_text_with_ocrmypdf(path):
+    text, _ = extract_text_layered(path)
+    return text
 
 
 # PREPROCESSAMENTO
-def preprocess_image_opencv(pil_image):
-    img = np.array(pil_image.convert("L"))  # Grayscale
-    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-    img = clahe.apply(img)
-    img = cv2.fastNlMeansDenoising(img, None, 15, 7, 21)
-
-    coords = np.column_stack(np.where(img < 255))
-    if len(coords) > 0:
-        angle = cv2.minAreaRect(coords)[-1]
-        angle = -(90 + angle) if angle < -45 else -angle
-        (h, w) = img.shape[:2]
-        M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
-        img = cv2.warpAffine(img, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
-    return Image.fromarray(img)
+def preprocess_image_opencv(pil_image, timings=None, deskew=True):
+    # aceita PIL ou array numpy (páginas vindas do PageCache)
+    # CLAHE -> denoise só se o ruído estimado pedir -> deskew estimado em cópia reduzida
+    # (ver ocr/preprocess.py; `timings` recebe o tempo de cada operação)
+    if isinstance(pil_image, np.ndarray):
+        img = pil_image
+    else:
+        img = np.array(pil_image.convert("L"))  # Grayscale
+    return Image.fromarray(preprocess_gray(img, timings, deskew=deskew))
 
 # ORIENTACAO TEXTO
 def detect_orientation_tesseract(pil_image):
     try:
-        osd = pytesseract.image_to_osd(pil_image)
-        angle = int(re.search(r'Rotate: (\d+)', osd).group(1))
+        angle = get_engine().osd_rotation(pil_image)
 
         if angle in (90, 270):
             return "horizontal"
         return "vertical"
     except:
         return "vertical"
+
+def detect_orientation_pdf(path, page_index=0):
+    """Orientação pela geometria da página no PDF (sem rasterizar) — para PDFs digitais."""
+    try:
+        with fitz.open(path) as doc:
+            rect = doc[page_index].rect  # já considera /Rotate
+        return "horizontal" if rect.width > rect.height else "vertical"
+    except Exception:
+        return "vertical"
     
 def clean_text(text):
     text = text.replace('’', "'").replace('“', '"').replace('”', '"')
@@ -103,8 +296,17 @@ def extract_date_with_special_ocr(image_path):
     img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
     if img is None:
         return []
+    return extract_date_with_special_ocr_array(img)
+
+_DATE_REGEX = re.compile(r"\b(?:[0-3]?\d[\/.\-][0-1]?\d[\/.\-](?:\d{2}|\d{4}))\b")
+
 
-    img = cv2.resize(img, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+def _prepare_date_image(img, scale=2):
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+    if scale != 1:
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
     img = cv2.GaussianBlur(img, (3,3), 0)
 
     img = cv2.adaptiveThreshold(
@@ -113,9 +315,21 @@ def extract_date_with_special_ocr(image_path):
         cv2.THRESH_BINARY,
         31, 10
     )
+    return img
 
-    config = r"--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789/.-"
-    raw = pytesseract.image_to_string(img, config=config)
+def extract_date_with_special_ocr_array(img):
+    """OCR dedicado para datas a partir de uma página já em memória (cinza ou BGR)."""
+    if img is None or img.size == 0:
+        return []
 
-    date_regex = r"\b(?:[0-3]?\d[\/.\-][0-1]?\d[\/.\-](?:\d{2}|\d{4}))\b"
-    return re.findall(date_regex, raw)
+    config = r"--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789/.-"
+    # DPI adaptativo: primeiro a página como veio; a ampliação 2x (4x os pixels)
+    # só quando nenhuma data aparece
+    for scale in ((1, 2) if OCR_ADAPTIVE_DPI else (2,)):
+        # cache pelo hash da página original: acerto pula o resize/threshold e o Tesseract
+        raw = cached_image_to_string(img, lang=None, config=config, etapa=f"data_x{scale}",
+                                     preprocess=partial(_prepare_date_image, scale=scale))
+        dates = _DATE_REGEX.findall(raw)
+        if dates:
+            return dates
+    return []